@@ -0,0 +1,202 @@
+"""Schedule slides animations according to the data they exchange,
+running independent ones concurrently,
+and record their outcome so that unchanged slides need not be animated again.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from copy import deepcopy
+from hashlib import sha256
+import multiprocessing as mp
+from pathlib import Path
+import sys
+from typing import Any, Dict, Iterable, List, Set, Type, cast
+
+from cache import AnimationCache
+from document import Document, Slide, macros
+
+
+class Animation(object):
+    """What animating one stub slide produced:
+    the slide itself followed by every slide 'split' from it,
+    and the data it returned for later use by the other slides.
+    """
+
+    def __init__(self, slides: List[Slide], outputs: Dict[str, Any], key: str):
+        self.slides = slides
+        # Pristine copy, since consumers are free to modify what they are given.
+        self.outputs = deepcopy(outputs)
+        self.key = key  # (see `fingerprint`)
+
+    @property
+    def module(self) -> str:
+        """Python module defining the animation."""
+        return type(self.slides[0]).__module__
+
+    @staticmethod
+    def run(
+        SlideType: Type[Slide], name: str, stub: str, inputs: List, key: str
+    ) -> "Animation":
+        """Animate a fresh stub slide within its own document,
+        collecting the slides it splits into.
+        """
+        document = Document("")
+        slide = SlideType(name, stub, document)
+        document.slides.append(slide)
+        exports = slide.animate(*inputs)
+        names = SlideType.outputs
+        if len(names) == 1:
+            exports = (exports,)
+        elif not names:
+            exports = ()
+        assert len(exports) == len(names)
+        return Animation(list(document.slides), dict(zip(names, exports)), key)
+
+    def restore(self, slide: Slide):
+        """Substitute recorded slides to the stub slide within its document."""
+        document = slide._document
+        assert isinstance(document, Document)
+        slides = document.slides
+        i = slides.index(slide)
+        slides[i : i + 1] = self.slides
+        for s in self.slides:
+            s._document = document
+
+
+def common_fingerprint(slides: Iterable[Slide]) -> str:
+    """Hash of what every animation depends on besides its own module:
+    the other python modules of the project,
+    and the macros signatures that placeholders are made from.
+    """
+    root = Path(__file__).parent
+    own = {type(slide).__module__ for slide in slides}
+    files = sorted(
+        Path(file)
+        for name, module in list(sys.modules.items())
+        if name not in own
+        and (file := getattr(module, "__file__", None))
+        and Path(file).parent == root
+        and Path(file).name != "main.py"  # (only arranges slides once animated)
+    )
+    h = sha256(sys.version.encode())
+    for file in files:
+        h.update(file.name.encode())
+        with open(file, "rb") as f:
+            h.update(sha256(f.read()).digest())
+    generated = Path("tex", "generated_steps.tex")
+    for file, entry in sorted(macros.files.items()):
+        if (path := Path(file)).parent == generated.parent and path != generated:
+            h.update(repr((file, entry["ndc"], entry["nc"])).encode())
+    return h.hexdigest()
+
+
+def fingerprint(slide: Slide, common: str, inputs: Iterable[str]) -> str:
+    """Content address of one slide animation:
+    hash of its module source, its stub section,
+    the fingerprints of the animations producing its inputs,
+    and the common fingerprint.
+    """
+    module = sys.modules[type(slide).__module__]
+    h = sha256(common.encode())
+    for part in (type(slide).__qualname__, slide.name, slide.stub, *inputs):
+        h.update(part.encode() + b"\0")
+    with open(cast(str, module.__file__), "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def dependencies(slides: List[Slide]) -> Dict[str, Set[str]]:
+    """Names of the slides producing the inputs of every slide."""
+    producers: Dict[str, str] = {}
+    for slide in slides:
+        for output in slide.outputs:
+            if output in producers:
+                raise RuntimeError(
+                    f"Both {producers[output]} and {slide.name} slides "
+                    f"produce {repr(output)}."
+                )
+            producers[output] = slide.name
+    graph = {}
+    for slide in slides:
+        if missing := [i for i in slide.inputs if i not in producers]:
+            raise RuntimeError(
+                f"No slide produces {', '.join(map(repr, missing))} "
+                f"for {slide.name} slide."
+            )
+        graph[slide.name] = {producers[i] for i in slide.inputs}
+    return graph
+
+
+def animate(
+    doc: Document,
+    previous: Dict[str, Animation] | None = None,
+    workers: int = 1,
+    cache: AnimationCache | None = None,
+) -> Dict[str, Animation]:
+    """Animate every stub slide of the document once its dependencies are,
+    in a pool of processes sending recorded slides back if several workers.
+    Animations with the same fingerprint are reused from the previous ones,
+    or loaded from the cache.
+    """
+    previous = previous or {}
+    stubs = {slide.name: slide for slide in doc.slides}
+    graph = dependencies(list(stubs.values()))
+    common = common_fingerprint(stubs.values())
+    waiting = dict(graph)
+    animations: Dict[str, Animation] = {}
+    exported: Dict[str, Any] = {}  # (all outputs of the animations done)
+    pending: Dict[Future, str] = {}
+
+    def done(name: str, animation: Animation):
+        animations[name] = animation
+        exported.update(animation.outputs)
+
+    def ran(name: str, animation: Animation):
+        done(name, animation)
+        if cache:
+            cache.put(name, animation.key, animation)
+
+    pool = None
+    if workers > 1:
+        # (fork so that workers share modules as possibly reloaded in this process)
+        fork = "fork" in mp.get_all_start_methods()
+        pool = ProcessPoolExecutor(workers, mp.get_context("fork") if fork else None)
+    print(f"Animate {len(stubs)} slides on {workers} workers..")
+    try:
+        while waiting or pending:
+            ready = [n for n, deps in waiting.items() if deps <= animations.keys()]
+            if not ready and not pending:
+                raise RuntimeError(
+                    f"Circular dependencies among slides {', '.join(waiting)}."
+                )
+            for name in ready:
+                del waiting[name]
+                slide = stubs[name]
+                upstream = sorted(animations[p].key for p in graph[name])
+                key = fingerprint(slide, common, upstream)
+                if (last := previous.get(name)) and last.key == key:
+                    print(f"Reuse {name} animation.")
+                    done(name, last)
+                    continue
+                if cache and (cached := cache.get(name, key)):
+                    done(name, cached)
+                    continue
+                job = (type(slide), name, slide.stub)
+                inputs = [exported[i] for i in slide.inputs]
+                if pool:
+                    pending[pool.submit(Animation.run, *job, inputs, key)] = name
+                else:
+                    ran(name, Animation.run(*job, deepcopy(inputs), key))
+            if ready:
+                continue
+            if pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    ran(pending.pop(future), future.result())
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    if cache:
+        print(cache.report())
+    for name, slide in stubs.items():
+        animations[name].restore(slide)
+    return animations
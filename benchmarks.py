@@ -0,0 +1,248 @@
+"""Micro-benchmarks for the hot paths of the generation process.
+Run all of them with `python benchmarks.py`, or only some by name.
+"""
+
+from argparse import ArgumentParser
+from difflib import SequenceMatcher
+from time import perf_counter
+from timeit import timeit
+from typing import Callable, Dict, List
+
+from diffs import DiffLineColumns, DiffLines, myers_diff
+from modifiers import AnonymousPlaceHolder, MakePlaceHolder, Regex
+from repo import History, Repo
+
+
+def bench_placeholder_parse():
+    """Parsing long inputs with the literal matcher vs. the equivalent regex."""
+    _, Command = MakePlaceHolder(
+        "Command", r"\Command[<name>][<anchor>]{<ref>}{<offset>}{<text>}"
+    )
+    for n_lines in (10, 100, 1000):
+        text = "\n".join(f"git commit -m 'Line {i} {{}}/'" for i in range(n_lines))
+        input = rf"\Command[cmd][north]{{repo}}{{0, 5}}{{{text}}}"
+        n = max(10, 10000 // n_lines)
+        literal = timeit(lambda: Command.parse(input), number=n) / n
+        regex = (
+            timeit(lambda: Regex(input, Command.regex, Command.groups), number=n) / n
+        )
+        print(
+            f"  {n_lines:>5} lines: "
+            f"regex {1e6 * regex:8.1f}µs, literal {1e6 * literal:8.1f}µs "
+            f"(x{regex / literal:.1f})"
+        )
+
+
+def bench_placeholder_new():
+    """Constructing placeholders directly vs. formatting then parsing."""
+    _, Label = MakePlaceHolder(
+        "Label",
+        r"\Label[<name>][<anchor>][<style>]{<ref>}{<offset>}{<start>}{<text>}",
+        name="unnamed",
+        anchor="base",
+        style="",
+    )
+    args = ("a1b2c3d", "45:13", "4.5, 2", "main")
+    kwargs = dict(name="main", anchor="base west", style="")
+
+    def reparse():
+        kw = Label.options.copy()
+        kw.update(kwargs)
+        return Label.parse(Label.model.format(*args, **kw))
+
+    n = 10000
+    direct = timeit(lambda: Label.new(*args, **kwargs), number=n) / n
+    parsed = timeit(reparse, number=n) / n
+    print(
+        f"  format+parse {1e6 * parsed:.1f}µs, direct {1e6 * direct:.1f}µs "
+        f"(x{parsed / direct:.1f})"
+    )
+
+
+def bench_anonymous():
+    """Parsing anonymous placeholders with interned vs. fresh builders."""
+    pattern = r"\Step[<type>]{<progress>}"
+    input = r"\Step[pizzas]{12/395}"
+
+    def uninterned():
+        _, builder = MakePlaceHolder("Anonymous", pattern, _positionals="")
+        return builder.parse(input)
+
+    n = 10000
+    interned = timeit(lambda: AnonymousPlaceHolder(pattern, "parse", input), number=n)
+    fresh = timeit(uninterned, number=n)
+    print(
+        f"  fresh {1e6 * fresh / n:.1f}µs, interned {1e6 * interned / n:.1f}µs "
+        f"(x{fresh / interned:.1f})"
+    )
+
+
+def synthetic_repo(n_commits: int, n_labels: int) -> Repo:
+    """Linear history with branches spread over it."""
+    repo = Repo(r"\Repo[repo][simple][1]{-1, -1}{}{}")
+    for i in range(n_commits):
+        repo.add_commit("I", f"{i:07x}", f"Commit {i}.")
+    step = max(1, n_commits // max(1, n_labels))
+    for i in range(n_labels):
+        repo.add_branch(f"branch{i}", f"{(i * step) % n_commits:07x}")
+    return repo
+
+
+def bench_myers_diff():
+    """Diffing long texts with a few edits, vs. difflib."""
+    for n_lines in (100, 1000, 10000):
+        old = [f"Line {i}: some pizza recipe." for i in range(n_lines)]
+        new = list(old)
+        for i in range(1, n_lines, n_lines // 5):
+            new[i] = new[i].upper()
+        n = 5
+        myers = timeit(lambda: myers_diff(old, new), number=n) / n
+        difflib = (
+            timeit(lambda: SequenceMatcher(None, old, new).get_opcodes(), number=n)
+            / n
+        )
+        print(
+            f"  {n_lines:>5} lines: "
+            f"difflib {1e3 * difflib:7.2f}ms, myers {1e3 * myers:7.2f}ms"
+        )
+
+
+def bench_diff_snapshot():
+    """Editing long diffed files, then snapshotting them, placeholders vs. columns."""
+    for n_lines in (100, 1000, 10000):
+        rows = [f"0/{{Line {i}: some pizza recipe.}}" for i in range(n_lines)]
+        placeholders = DiffLines.parse(",\n".join(rows))
+        columns = DiffLineColumns.parse(",\n".join(rows))
+
+        def edit(lines):
+            line = lines[n_lines // 2]
+            line.mod = "+" if line.mod == "0" else "0"
+            line.text = "Line: some other pizza recipe."
+
+        n = 20
+        timings = []
+        for lines in (placeholders, columns):
+            edited = snapshotted = 0.0
+            for _ in range(n):
+                start = perf_counter()
+                edit(lines)
+                middle = perf_counter()
+                lines.snapshot()
+                edited += middle - start
+                snapshotted += perf_counter() - middle
+            timings.append((edited / n, snapshotted / n))
+        (pe, ps), (ce, cs) = timings
+        print(
+            f"  {n_lines:>5} lines: "
+            f"placeholders edit {1e3 * pe:6.3f}ms + snapshot {1e3 * ps:6.3f}ms, "
+            f"columns edit {1e3 * ce:6.3f}ms + snapshot {1e3 * cs:6.3f}ms"
+        )
+
+
+def bench_repo_lookups():
+    """Highlighting and moving labels within long histories."""
+    for n_commits in (10, 100, 1000):
+        repo = synthetic_repo(n_commits, n_commits // 5)
+        names = [f"branch{i}" for i in range(n_commits // 5)]
+        hashes = [f"{i:07x}" for i in range(n_commits)]
+
+        def highlight():
+            for name in names:
+                repo.hi_on(name).hi_off(name)
+
+        def move():
+            for i, name in enumerate(names):
+                repo.move_branch(name, hashes[-1 - i])
+
+        n = 10
+        hi = timeit(highlight, number=n) / n / len(names)
+        mv = timeit(move, number=n) / n / len(names)
+        print(
+            f"  {n_commits:>5} commits: "
+            f"hi_on/hi_off {1e6 * hi:6.1f}µs, move_branch {1e6 * mv:6.1f}µs"
+        )
+
+
+def bench_repo_layout():
+    """Laying out labels of long histories, from scratch vs. known topology."""
+    for n_commits, n_labels in ((100, 20), (1000, 200)):
+        repo = synthetic_repo(n_commits, n_labels)
+        # Two parallel chains until the end.
+        repo.commits[1].type = "Y"
+        repo.commits[-1].type = "A"
+
+        def fresh():
+            Repo._layouts.clear()
+            repo.pre_render()
+
+        n = 10
+        scratch = timeit(fresh, number=n) / n
+        known = timeit(repo.pre_render, number=n) / n
+        print(
+            f"  {n_commits:>5} commits, {n_labels:>3} labels: "
+            f"scratch {1e3 * scratch:6.2f}ms, known {1e3 * known:6.2f}ms"
+        )
+
+
+def bench_repo_view():
+    """Rendering long histories in full vs. only their last commits in view."""
+    for n_commits in (100, 1000, 10000):
+        full = synthetic_repo(n_commits, n_commits // 5)
+        viewed = synthetic_repo(n_commits, n_commits // 5).view(n_commits - 9)
+
+        def render(repo: Repo):
+            repo.invalidate()
+            repo.commits.invalidate()
+            Repo._layouts.clear()
+            repo.render()
+
+        n = 5
+        whole = timeit(lambda: render(full), number=n) / n
+        window = timeit(lambda: render(viewed), number=n) / n
+        print(
+            f"  {n_commits:>5} commits: "
+            f"full {1e3 * whole:8.2f}ms, last 10 {1e3 * window:6.2f}ms"
+        )
+
+
+def bench_history_rows():
+    """Laying out histories with many short-lived feature branches into rows."""
+    for n_commits in (1000, 10000, 100000):
+        history = History()
+        main = history.commit("0", "Root.")
+        features: List[str] = []  # Feature branches tips.
+        for i in range(1, n_commits):
+            hash = str(i)
+            if i % 4 == 0 and features:  # Merge the oldest feature.
+                main = history.commit(hash, "Merge.", (main, features.pop(0)))
+            elif i % 2 and len(features) < 20:  # Start a new one.
+                features.append(history.commit(hash, "Fork.", main))
+            elif features:  # Work on the latest one.
+                features[-1] = history.commit(hash, "Work.", features[-1])
+            else:
+                main = history.commit(hash, "Work.", main)
+        n = 3
+        time = timeit(lambda: history.rows(main, strict=False), number=n) / n
+        # (only the two first lanes are drawn as such, the others are flattened)
+        n_lanes = max(lane for _, lane in history.lanes(main)) + 1
+        print(
+            f"  {n_commits:>6} commits on {n_lanes} lanes: "
+            f"{1e3 * time:7.2f}ms ({1e6 * time / n_commits:.2f}µs/commit)"
+        )
+
+
+benchmarks: Dict[str, Callable[[], None]] = {
+    name.removeprefix("bench_"): f
+    for name, f in dict(globals()).items()
+    if name.startswith("bench_")
+}
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Run micro-benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"Among {', '.join(benchmarks)}.")
+    args = parser.parse_args()
+    if unknown := set(args.names) - set(benchmarks):
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}.")
+    for name in args.names or benchmarks:
+        print(f"{name}: {benchmarks[name].__doc__}")
+        benchmarks[name]()
@@ -0,0 +1,123 @@
+"""Persistent, content-addressed caches of individually compiled steps,
+so that only steps whose rendered code changed are sent to lualatex again,
+and of slides animations, so that only slides whose sources changed are animated again.
+"""
+
+from hashlib import sha256
+import os
+from pathlib import Path
+import pickle
+import shutil as shu
+from typing import Any, Iterable, List
+
+
+class StepCache(object):
+    """One single-page pdf per compiled step, stored under the hash
+    of the step's standalone rendered document (head, slide header, step, tail)
+    combined with the hash of every file this rendering depends on
+    (`\\input`ed .tex files, pictures).
+    Least recently used entries are evicted once the cache exceeds its size.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        dependencies: Iterable[Path],
+        max_size: int = 500 * 2**20,  # (bytes)
+    ):
+        self.folder = folder
+        self.max_size = max_size
+        os.makedirs(folder, exist_ok=True)
+        deps = sha256()
+        for file in sorted(dependencies):
+            deps.update(file.as_posix().encode())
+            with open(file, "rb") as f:
+                deps.update(sha256(f.read()).digest())
+        self.dependencies_hash = deps.hexdigest()
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+
+    def key(self, text: str) -> str:
+        """Content address of one rendered step."""
+        return sha256((self.dependencies_hash + text).encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return Path(self.folder, key + ".pdf")
+
+    def get(self, key: str) -> Path | None:
+        """Retrieve cached pdf if any, marking it as recently used."""
+        if not os.path.exists(path := self.path(key)):
+            self.misses.append(key)
+            return None
+        os.utime(path)
+        self.hits.append(key)
+        return path
+
+    def put(self, key: str, pdf: Path) -> Path:
+        shu.copy(pdf, path := self.path(key))
+        return path
+
+    def evict(self) -> List[Path]:
+        """Remove least recently used entries until the cache fits its size."""
+        entries = sorted(
+            (os.stat(p).st_mtime, os.stat(p).st_size, p)
+            for p in self.folder.glob("*.pdf")
+        )
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            evicted.append(path)
+            total -= size
+        return evicted
+
+    def report(self) -> str:
+        n = len(self.hits) + len(self.misses)
+        rate = f" ({100 * len(self.hits) / n:.0f}% hits)" if n else ""
+        return f"Step cache: {len(self.hits)} hits, {len(self.misses)} misses{rate}."
+
+
+class AnimationCache(object):
+    """One pickle file per slide animation (recorded slides and outputs),
+    stored under the hash of everything the animation depends on
+    (see `animation.fingerprint`).
+    Only the latest entry is kept for every slide.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+
+    def path(self, name: str, key: str) -> Path:
+        return Path(self.folder, f"{name}-{key}.pickle")
+
+    def get(self, name: str, key: str) -> Any | None:
+        """Retrieve cached animation if any and still loadable with current code."""
+        try:
+            with open(self.path(name, key), "rb") as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            value = None
+        except Exception as e:
+            print(f"Could not load cached {name} animation ({e}).")
+            value = None
+        (self.misses if value is None else self.hits).append(name)
+        return value
+
+    def put(self, name: str, key: str, value: Any):
+        for old in self.folder.glob(f"{name}-*.pickle"):
+            os.remove(old)
+        path = self.path(name, key)
+        tmp = path.with_suffix(".tmp")  # (never leave a truncated entry)
+        with open(tmp, "wb") as file:
+            pickle.dump(value, file)
+        os.replace(tmp, path)
+
+    def report(self) -> str:
+        return (
+            f"Animation cache: {len(self.hits)} hits, {len(self.misses)} misses."
+        )
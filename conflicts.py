@@ -337,7 +337,7 @@ class ConflictsSlide(Slide):
         underline.off()
         STEP()
 
-        _, _, hi_eat, _ = left.replace_in_line(3, "(find the)", "eat all")
+        _, _, hi_eat, _ = left.diff_line(3, "Where to eat all pizzas in the project:")
         left.mod = "m"
         STEP()
 
@@ -352,7 +352,7 @@ class ConflictsSlide(Slide):
         message.off()
         noconflict_on()
         merged.on().populate(right)
-        merged.replace_in_line(3, "(find the)", "eat all")
+        merged.diff_line(3, "Where to eat all pizzas in the project:")
         from_on()
         STEP()
 
@@ -607,7 +607,7 @@ class ConflictsSlide(Slide):
         STEP()
 
         message.off()
-        left.replace_in_line(5, "(thirst)", "craave")
+        left.diff_line(5, "craave for fortune and originality <3")
         right[11].mod = "-"
         left.mod = right.mod = "m"
         STEP()
@@ -615,7 +615,9 @@ class ConflictsSlide(Slide):
         par_on("none")
         STEP()
 
-        _, _, hi_crave, _ = merged.on().replace_in_line(5, "(thirst)", "craave")
+        _, _, hi_crave, _ = merged.on().diff_line(
+            5, "craave for fortune and originality <3"
+        )
         merged[12].mod = "-"
         from_on()
         STEP()
@@ -655,15 +657,7 @@ class ConflictsSlide(Slide):
         STEP()
 
         from_on()
-        conflict = r"""
-            <<<<<<< HEAD
-            __Base:__ Sour cream
-            =======
-            __Base:__ Sour Cream
-            >>>>>>> github/main
-            """
-        merged.pop(7)
-        merged.on().insert_lines(conflict, "c", 7).mod = "c"
+        merged.on().merge(safe, left, right)
         par_off("lexical")
         STEP()
 
@@ -690,7 +684,7 @@ class ConflictsSlide(Slide):
         par_off()
         merged.populate(safe)
         reset()
-        right.replace_in_line(3, "team()", ",")
+        right.diff_line(3, "An amazing surprise of the dev team,")
         right.insert_lines("a typical tomato-based pizza, but", "+", 5)
         right.mod = "m"
         STEP()
@@ -723,7 +717,7 @@ class ConflictsSlide(Slide):
         merged.populate(safe)
         reset()
         left.replace_in_line(9, "(G)arlic", "Sweet g")
-        right.replace_in_line(9, "Garlic()", ", pepper or anything spicy")
+        right.diff_line(9, "- Garlic, pepper or anything spicy")
         left.mod = right.mod = "m"
         STEP()
 
@@ -733,15 +727,7 @@ class ConflictsSlide(Slide):
         STEP()
 
         from_on()
-        conflict = r"""
-            <<<<<<< HEAD
-            - Sweet garlic
-            =======
-            - Garlic, pepper or anything spicy
-            >>>>>>> github/main
-            """
-        merged.on().pop(9)
-        merged.insert_lines(conflict, "c", 9).mod = "c"
+        merged.on().merge(safe, left, right)
         par_off()
         STEP()
 
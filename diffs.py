@@ -2,8 +2,11 @@
 """
 
 import re
+from bisect import bisect_right
+from itertools import accumulate
+from sys import intern
 from textwrap import dedent
-from typing import Iterable, List, Tuple, cast
+from typing import Any, Dict, Iterable, List, Tuple, cast
 
 from modifiers import (
     AnonymousPlaceHolder,
@@ -12,6 +15,8 @@ from modifiers import (
     MakePlaceHolder,
     PlaceHolder,
     TextModifier,
+    Writer,
+    render_into_method,
     render_method,
 )
 
@@ -19,6 +24,499 @@ DiffLineModifier, DiffLine = MakePlaceHolder("DiffLine", r"<mod>/{<text>}")
 DiffLines = ListBuilder(DiffLine, ",\n", tail=True)
 
 
+def myers_diff(a: List[str], b: List[str]) -> List[Tuple[str, str]]:
+    """Shortest edit script turning lines a into lines b, as (mod, line) pairs:
+    "0" for common lines, "-" for deleted ones and "+" for inserted ones,
+    deletions coming first within every change.
+    Myers' greedy algorithm runs in O((N + M) D) for an edit distance D,
+    so it is fast on the small edits diffed files usually show.
+    """
+    # Common head and tail are trivially part of it.
+    n_head = 0
+    while n_head < min(len(a), len(b)) and a[n_head] == b[n_head]:
+        n_head += 1
+    n_tail = 0
+    while (
+        n_tail < min(len(a), len(b)) - n_head
+        and a[len(a) - 1 - n_tail] == b[len(b) - 1 - n_tail]
+    ):
+        n_tail += 1
+    a_mid = a[n_head : len(a) - n_tail]
+    b_mid = b[n_head : len(b) - n_tail]
+    n, m = len(a_mid), len(b_mid)
+
+    # Furthest x reached on every diagonal k = x - y, after every d edits.
+    v: Dict[int, int] = {1: 0}
+    trace: List[Dict[int, int]] = []
+    for d in range(n + m + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]  # (insertion)
+            else:
+                x = v[k - 1] + 1  # (deletion)
+            y = x - k
+            while x < n and y < m and a_mid[x] == b_mid[y]:
+                x, y = x + 1, y + 1
+            v[k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+
+    # Backtrack from the end through the diagonals reached.
+    script: List[Tuple[str, str]] = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = v[previous_k]
+        previous_y = previous_x - previous_k
+        while x > previous_x and y > previous_y:
+            script.append(("0", a_mid[x - 1]))
+            x, y = x - 1, y - 1
+        if d:
+            if x == previous_x:
+                script.append(("+", b_mid[y - 1]))
+            else:
+                script.append(("-", a_mid[x - 1]))
+        x, y = previous_x, previous_y
+    script.reverse()
+    return (
+        [("0", line) for line in a[:n_head]]
+        + script
+        + [("0", line) for line in a[len(a) - n_tail :]]
+    )
+
+
+def _matches(script: List[Tuple[str, str]]) -> Dict[int, int]:
+    """Position in the new lines of every common line, by position in the old."""
+    matches = {}
+    i = j = 0
+    for mod, _ in script:
+        if mod == "0":
+            matches[i] = j
+        i += mod != "+"
+        j += mod != "-"
+    return matches
+
+
+def diff3(
+    base: List[str], mine: List[str], theirs: List[str]
+) -> List[Tuple[List[str], List[str], List[str]]]:
+    """Split the three versions into aligned chunks of base, mine and theirs lines,
+    alternating between stable chunks (the same lines in all three)
+    and unstable ones (changed on at least one side), like `diff3` does.
+    """
+    a = _matches(myers_diff(base, mine))
+    b = _matches(myers_diff(base, theirs))
+    chunks: List[Tuple[List[str], List[str], List[str]]] = []
+    o = i = j = 0  # Current positions in base, mine and theirs.
+    while True:
+        # Lines in sync on all three.
+        n = 0
+        while a.get(o + n) == i + n and b.get(o + n) == j + n:
+            n += 1
+        if n:
+            chunks.append((base[o : o + n], mine[i : i + n], theirs[j : j + n]))
+            o, i, j = o + n, i + n, j + n
+        # Next base line kept on both sides, if any.
+        next_o = next((k for k in range(o, len(base)) if k in a and k in b), None)
+        if next_o is None:
+            if o < len(base) or i < len(mine) or j < len(theirs):
+                chunks.append((base[o:], mine[i:], theirs[j:]))
+            return chunks
+        if next_o > o or a[next_o] > i or b[next_o] > j:
+            chunks.append((base[o:next_o], mine[i : a[next_o]], theirs[j : b[next_o]]))
+        o, i, j = next_o, a[next_o], b[next_o]
+
+
+def merge3(
+    base: List[str],
+    mine: List[str],
+    theirs: List[str],
+    names: Tuple[str, str] = ("HEAD", "github/main"),
+) -> List[Tuple[str, str]]:
+    """Merged lines as (mod, line) pairs: "0" for lines merged automatically,
+    "c" for conflicting changes, surrounded with git's conflict markers
+    naming both sides.
+    """
+    merged: List[Tuple[str, str]] = []
+    for o, a, b in diff3(base, mine, theirs):
+        if a == o or a == b:
+            merged.extend(("0", line) for line in b)
+        elif b == o:
+            merged.extend(("0", line) for line in a)
+        else:
+            merged.append(("c", "<" * 7 + " " + names[0]))
+            merged.extend(("c", line) for line in a)
+            merged.append(("c", "=" * 7))
+            merged.extend(("c", line) for line in b)
+            merged.append(("c", ">" * 7 + " " + names[1]))
+    return merged
+
+
+# LaTeX commands and escaped characters are tokens on their own.
+_token = re.compile(r"\\[A-Za-z]+|\\.|\w+|\s+|.")
+
+
+def _balanced(text: str) -> bool:
+    text = text.replace(r"\{", "").replace(r"\}", "")
+    depth = 0
+    for c in text:
+        depth += (c == "{") - (c == "}")
+        if depth < 0:
+            return False
+    return not depth
+
+
+def _mark_changes(tokens: List[Tuple[bool, str]]) -> str | None:
+    r"""Join tokens, wrapping runs of changed ones into \dhi{}.
+    Whitespace between changes belongs to them, not around.
+    None if a run would break braces.
+    """
+    changed = [c for c, _ in tokens]
+    for i in range(1, len(tokens) - 1):
+        if tokens[i][1].isspace() and changed[i - 1] and changed[i + 1]:
+            changed[i] = True
+    chunks: List[str] = []
+    i = 0
+    while i < len(tokens):
+        if not changed[i]:
+            chunks.append(tokens[i][1])
+            i += 1
+            continue
+        j = i
+        while j < len(tokens) and changed[j]:
+            j += 1
+        text = "".join(token for _, token in tokens[i:j])
+        core = text.strip()
+        if not _balanced(core) or re.search(r"\\[A-Za-z]+$", core):
+            return None  # (or a command would lose its arguments)
+        if core:
+            head, tail = text.split(core, 1)
+            text = head + r"\dhi{" + core + "}" + tail
+        chunks.append(text)
+        i = j
+    return "".join(chunks)
+
+
+def intraline_diff(old: str, new: str) -> Tuple[str, str]:
+    r"""Texts of both lines with the tokens differing wrapped into \dhi{}.
+    Lines whose changes cannot be wrapped without breaking braces
+    are wrapped as a whole.
+    """
+    a, b = _token.findall(old), _token.findall(new)
+    script = myers_diff(a, b)
+    before = [(mod == "-", token) for mod, token in script if mod != "+"]
+    after = [(mod == "+", token) for mod, token in script if mod != "-"]
+    marked = []
+    for text, tokens in ((old, before), (new, after)):
+        if (m := _mark_changes(tokens)) is None:
+            m = r"\dhi{" + text + "}"
+        marked.append(m)
+    return marked[0], marked[1]
+
+
+class IntralineDiffs(object):
+    """Process-wide cache of intra-line diffs,
+    since the same lines are usually diffed again over many steps.
+    Cleared once full.
+    """
+
+    diffs: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    max_size = 10000
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def get(cls, old: str, new: str) -> Tuple[str, str]:
+        if (diff := cls.diffs.get(key := (old, new))) is not None:
+            cls.hits += 1
+            return diff
+        cls.misses += 1
+        if len(cls.diffs) >= cls.max_size:
+            cls.diffs.clear()
+        diff = cls.diffs[key] = intraline_diff(old, new)
+        return diff
+
+    @classmethod
+    def report(cls) -> str:
+        return (
+            f"Intra-line diffs: {len(cls.diffs)} pairs, "
+            f"{cls.hits} hits, {cls.misses} misses."
+        )
+
+
+class DiffLineView(object):
+    """Read/write access to one line of diffed lines columns,
+    following it when other lines are inserted or removed before it.
+    Raise LookupError once the line itself has been removed.
+    """
+
+    __slots__ = ("lines", "id", "hint")
+
+    def __init__(self, lines: "DiffLineColumns", i: int):
+        self.lines = lines
+        self.id = lines.id(i)
+        self.hint = i  # (last known index)
+
+    @property
+    def i(self) -> int:
+        self.hint = self.lines.index(self.id, self.hint)
+        return self.hint
+
+    @property
+    def mod(self) -> str:
+        return self.lines.mod(self.i)
+
+    @mod.setter
+    def mod(self, mod: str):
+        self.lines.set_mods([self.i], mod)
+
+    @property
+    def text(self) -> str:
+        return self.lines.text(self.i)
+
+    @text.setter
+    def text(self, text: str):
+        self.lines.set_texts({self.i: text})
+
+    def copy(self) -> PlaceHolder:  # DiffLine
+        """Standalone line, detached from the columns."""
+        return DiffLine.new(self.mod, self.text)
+
+    def render(self) -> str:
+        return self.lines.row(self.i)
+
+
+# Columns of one chunk of lines: (codes, texts, ids).
+Chunk = Tuple[bytes, Tuple[str, ...], Tuple[int, ...]]
+
+
+class DiffLineColumns(TextModifier):
+    """Diffed lines stored as columns instead of one placeholder per line:
+    one byte per line indexing its mod into the table of mods met,
+    one interned string per line for its text, and one unique id per line
+    so views can find it again.
+    Columns are cut into immutable chunks of lines, replaced on every edit,
+    so an edit only copies the chunks it touches
+    and snapshots share all the others (see `TextModifier._shared`).
+    """
+
+    _shared = ("codes", "texts", "ids", "table")
+    # Index of the first line of every chunk, for the chunks it was computed from.
+    _internals = TextModifier._internals + ("_starts",)
+    chunk_size = 256
+    # Next line id, unique process-wide so stale views never find another line.
+    _next_id = 0
+    builder = DiffLine
+    separator = ",\n"
+
+    def __init__(
+        self,
+        lines: Iterable[Tuple[str, str]] = (),  # (mod, text)
+        tail: Constant | None = None,
+    ):
+        self.codes: Tuple[bytes, ...] = ()
+        self.texts: Tuple[Tuple[str, ...], ...] = ()
+        self.ids: Tuple[Tuple[int, ...], ...] = ()
+        self.table: Tuple[str, ...] = ()
+        self.tail = tail
+        self.insert(0, lines)
+
+    def __setstate__(self, state: Dict[str, Any]):
+        # (ids given within another process must not be given again in this one)
+        self.__dict__.update(state)
+        last = max((max(ids) for ids in self.ids), default=-1)
+        DiffLineColumns._next_id = max(DiffLineColumns._next_id, last + 1)
+
+    @staticmethod
+    def parse(input: str) -> "DiffLineColumns":
+        parsed = DiffLines.parse(input)
+        return DiffLineColumns(((l.mod, l.text) for l in parsed), parsed.tail)
+
+    def code(self, mod: str) -> int:
+        """Index of the mod within the table, added if new."""
+        try:
+            return self.table.index(mod)
+        except ValueError:
+            assert len(self.table) < 256
+            self.table += (mod,)
+            return len(self.table) - 1
+
+    def starts(self) -> List[int]:
+        """Index of the first line of every chunk, then number of lines."""
+        cached = self.__dict__.get("_starts")
+        if cached is None or cached[0] is not self.codes:
+            starts = [0, *accumulate(len(codes) for codes in self.codes)]
+            cached = self.__dict__["_starts"] = (self.codes, starts)
+        return cached[1]
+
+    def locate(self, i: int) -> Tuple[int, int]:
+        """Chunk holding the i-th line, and index within it."""
+        starts = self.starts()
+        assert 0 <= i < starts[-1], f"No diffed line {i}."
+        k = bisect_right(starts, i) - 1
+        return k, i - starts[k]
+
+    def chunk(self, k: int) -> Chunk:
+        return self.codes[k], self.texts[k], self.ids[k]
+
+    def splice(self, start: int, end: int, chunks: Iterable[Chunk]):
+        """Replace chunks from start to end with the given lines,
+        cut again into chunks of at most chunk_size lines.
+        """
+        size = self.chunk_size
+        cut = [
+            (codes[s : s + size], texts[s : s + size], ids[s : s + size])
+            for codes, texts, ids in chunks
+            for s in range(0, len(codes), size)
+        ]
+        codes, texts, ids = (tuple(c) for c in zip(*cut)) if cut else ((), (), ())
+        self.texts = self.texts[:start] + texts + self.texts[end:]
+        self.ids = self.ids[:start] + ids + self.ids[end:]
+        self.codes = self.codes[:start] + codes + self.codes[end:]
+
+    def __len__(self) -> int:
+        return self.starts()[-1]
+
+    def __getitem__(self, i: int) -> DiffLineView:
+        return DiffLineView(self, range(len(self))[i])
+
+    def __iter__(self) -> Iterable[DiffLineView]:
+        for i in range(len(self)):
+            yield DiffLineView(self, i)
+
+    def mod(self, i: int) -> str:
+        k, j = self.locate(i)
+        return self.table[self.codes[k][j]]
+
+    def text(self, i: int) -> str:
+        k, j = self.locate(i)
+        return self.texts[k][j]
+
+    def id(self, i: int) -> int:
+        k, j = self.locate(i)
+        return self.ids[k][j]
+
+    def index(self, id: int, hint: int = 0) -> int:
+        """Current index of the line with this id, tried first at the hint."""
+        if 0 <= hint < len(self) and self.id(hint) == id:
+            return hint
+        for start, ids in zip(self.starts(), self.ids):
+            if id in ids:
+                return start + ids.index(id)
+        raise LookupError(f"Diffed line {id} has been removed.")
+
+    def mods(self) -> List[str]:
+        table = self.table
+        return [table[c] for codes in self.codes for c in codes]
+
+    def pairs(self) -> Iterable[Tuple[str, str]]:  # (mod, text)
+        table = self.table
+        for codes, texts in zip(self.codes, self.texts):
+            yield from zip((table[c] for c in codes), texts)
+
+    def set_mods(self, indices: Iterable[int], mod: str) -> "DiffLineColumns":
+        code = self.code(mod)
+        edited: Dict[int, bytearray] = {}
+        for i in indices:
+            k, j = self.locate(i)
+            if k not in edited:
+                edited[k] = bytearray(self.codes[k])
+            edited[k][j] = code
+        codes = list(self.codes)
+        for k, chunk in edited.items():
+            codes[k] = bytes(chunk)
+        self.codes = tuple(codes)
+        return self
+
+    def set_texts(self, texts: Dict[int, str]) -> "DiffLineColumns":
+        edited: Dict[int, List[str]] = {}
+        for i, text in texts.items():
+            k, j = self.locate(i)
+            if k not in edited:
+                edited[k] = list(self.texts[k])
+            edited[k][j] = intern(text)
+        columns = list(self.texts)
+        for k, chunk in edited.items():
+            columns[k] = tuple(chunk)
+        self.texts = tuple(columns)
+        return self
+
+    def insert(
+        self, i: int, lines: Iterable[Tuple[str, str]]  # (mod, text)
+    ) -> List[DiffLineView]:
+        """Insert lines before the python index, and return views on them."""
+        codes = bytearray()
+        texts = []
+        for mod, text in lines:
+            codes.append(self.code(mod))
+            texts.append(intern(text))
+        first = DiffLineColumns._next_id
+        ids = tuple(range(first, first + len(texts)))
+        DiffLineColumns._next_id += len(texts)
+        i = len(range(len(self))[:i])
+        if i < len(self):
+            k, j = self.locate(i)
+        elif self.codes:
+            k, j = len(self.codes) - 1, len(self.codes[-1])
+        else:
+            k = j = 0
+        if self.codes:
+            old_codes, old_texts, old_ids = self.chunk(k)
+        else:
+            old_codes, old_texts, old_ids = b"", (), ()
+        new = (
+            old_codes[:j] + codes + old_codes[j:],
+            old_texts[:j] + tuple(texts) + old_texts[j:],
+            old_ids[:j] + ids + old_ids[j:],
+        )
+        self.splice(k, k + 1, [new])
+        return [DiffLineView(self, i + d) for d in range(len(ids))]
+
+    def delete(self, start: int, end: int) -> "DiffLineColumns":
+        if start >= end:
+            return self
+        k, j = self.locate(start)
+        l, m = self.locate(end - 1)
+        before = tuple(c[:j] for c in self.chunk(k))
+        after = tuple(c[m + 1 :] for c in self.chunk(l))
+        self.splice(k, l + 1, [cast(Chunk, before), cast(Chunk, after)])
+        return self
+
+    def pop(self, i: int) -> PlaceHolder:  # DiffLine
+        line = self[i].copy()
+        i = range(len(self))[i]
+        self.delete(i, i + 1)
+        return line
+
+    def clear(self) -> "DiffLineColumns":
+        return self.delete(0, len(self))
+
+    def populate(self, other: "DiffLineColumns") -> "DiffLineColumns":
+        """Share all lines of the other columns."""
+        self.table = other.table
+        self.texts, self.ids, self.codes = other.texts, other.ids, other.codes
+        return self
+
+    def row(self, i: int) -> str:
+        return self.mod(i) + "/{" + self.text(i) + "}"
+
+    @render_into_method
+    def render_into(self, write: Writer):
+        rows = [m + "/{" + t + "}" for m, t in self.pairs()]
+        if self.tail:
+            rows.append(self.tail.render())
+        write(self.separator.join(rows))
+
+
 class DiffedFile(TextModifier):
     """One chain of diffed lines."""
 
@@ -32,16 +530,111 @@ class DiffedFile(TextModifier):
         )
         # Assume it's parsed without epilog.
         lines = lines.rsplit("}{}", 1)[0]
-        self.lines = DiffLines.parse(lines)
+        self.lines = DiffLineColumns.parse(lines)
         self.internal_epilog = Constant("")
+        # Only draw unchanged lines this close to changed ones if set (see `fold`).
+        self.context: int | None = None
+        self.fold_markers = True
 
     @staticmethod
-    def new(**kwargs) -> "DiffedFile":
-        """Create empty diffed file."""
+    def new(
+        location: str,
+        filename: str,
+        mod: str = "0",
+        name: str = "file",
+        linespacing: str = "5",
+    ) -> "DiffedFile":
+        r"""Create empty diffed file, with the same defaults as `\Diff`."""
         model = (
             "\\Diff[{mod}][{name}][{linespacing}]{{{location}}}{{{filename}}}{{\n}}{{}}"
         )
-        return DiffedFile(model.format(**kwargs))
+        return DiffedFile(
+            model.format(
+                mod=mod,
+                name=name,
+                linespacing=linespacing,
+                location=location,
+                filename=filename,
+            )
+        )
+
+    @staticmethod
+    def from_texts(old: str, new: str, **kwargs) -> "DiffedFile":
+        """Create diffed file showing the changes from old text to new one,
+        given at least its location and filename (see `new`).
+        """
+        return DiffedFile.new(**kwargs).diff_texts(old, new)
+
+    def diff_texts(self, old: str, new: str, marks: bool = False) -> "DiffedFile":
+        """Replace lines with the changes from old text to new one (see `myers_diff`),
+        possibly marking what changed within lines replaced one for one.
+        """
+        self.clear()
+        script = myers_diff(self.split_lines(old), self.split_lines(new))
+        if marks:
+            script = self.mark_changes(script)
+        self.lines.insert(0, script)
+        return self
+
+    @staticmethod
+    def mark_changes(script: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Pair lines deleted then inserted as many in a row,
+        and mark their differences (see `intraline_diff`).
+        """
+        marked = list(script)
+        i = 0
+        while i < len(marked):
+            j = i
+            while j < len(marked) and marked[j][0] == "-":
+                j += 1
+            k = j
+            while k < len(marked) and marked[k][0] == "+":
+                k += 1
+            if j - i and j - i == k - j:
+                for d in range(j - i):
+                    old, new = IntralineDiffs.get(marked[i + d][1], marked[j + d][1])
+                    marked[i + d], marked[j + d] = ("-", old), ("+", new)
+            i = max(k, i + 1)
+        return marked
+
+    def texts(self) -> List[str]:
+        r"""Lines of the file once changed as shown, without \dhi{} marks."""
+        return [
+            re.sub(r"\\dhi\{([^{}]*)\}", r"\1", text)
+            for mod, text in self.lines.pairs()
+            if mod != "-"
+        ]
+
+    def merge(
+        self,
+        base: "DiffedFile",
+        mine: "DiffedFile",
+        theirs: "DiffedFile",
+        names: Tuple[str, str] = ("HEAD", "github/main"),
+    ) -> "DiffedFile":
+        """Replace lines with the three-way merge of both changed versions of base,
+        marking the file conflicted if they cannot be merged (see `merge3`).
+        """
+        self.clear()
+        script = merge3(base.texts(), mine.texts(), theirs.texts(), names)
+        self.lines.insert(0, script)
+        if any(mod == "c" for mod, _ in script):
+            self.mod = "c"
+        return self
+
+    def diff_line(self, i: int, new: str) -> Tuple[PlaceHolder, ...]:  # DiffLine
+        r"""Replace the line with a deleted and an inserted one,
+        the differences with the new text marked into \dhi{}.
+        Return the same variants as `replace_in_line`.
+        """
+        i = self.line_index(i)
+        original = self.lines.pop(i)
+        before, after, merged = (original.copy() for _ in range(3))
+        before.mod, after.mod, merged.mod = "-", "+", "0"
+        before.text, after.text = IntralineDiffs.get(original.text, new)
+        merged.text = new
+        self.lines.insert(i, ((l.mod, l.text) for l in (before, after)))
+        return tuple(l.copy() for l in (original, before, after, merged))
 
     @property
     def name(self):
@@ -81,12 +674,63 @@ class DiffedFile(TextModifier):
         return (
             self.intro.render()
             + "{\n"
-            + self.lines.render()
+            + (self.lines.render() if self.context is None else self._render_folded())
             + "}{\n"
             + self.internal_epilog.render()
             + "}\n"
         )
 
+    def fold(self, context: int = 3, markers: bool = True) -> "DiffedFile":
+        """Only draw unchanged lines within context of changed ones, like hunks,
+        with one marker for every run of lines folded unless not requested.
+        Beware that lines are then numbered as drawn in the epilog.
+        """
+        self.context = context
+        self.fold_markers = markers
+        return self
+
+    def unfold(self) -> "DiffedFile":
+        self.context = None
+        return self
+
+    def folded(self) -> List[bool]:
+        """Whether every line is folded, in two linear sweeps."""
+        context = cast(int, self.context)
+        mods = self.lines.mods()
+        n = len(mods)
+        distance = [n + context + 1] * n  # To the closest changed line.
+        d = n + context + 1
+        for i, mod in enumerate(mods):
+            d = 0 if mod != "0" else d + 1
+            distance[i] = d
+        d = n + context + 1
+        for i in range(n - 1, -1, -1):
+            d = 0 if mods[i] != "0" else d + 1
+            distance[i] = min(distance[i], d)
+        return [d > context for d in distance]
+
+    def _render_folded(self) -> str:
+        rows = []
+        folded = 0
+        for i, fold in enumerate(self.folded()):
+            if fold:
+                folded += 1
+                continue
+            if folded and self.fold_markers:
+                rows.append(self._marker(folded))
+            folded = 0
+            rows.append(self.lines.row(i))
+        if folded and self.fold_markers:
+            rows.append(self._marker(folded))
+        if self.lines.tail:
+            rows.append(self.lines.tail.render())
+        return self.lines.separator.join(rows)
+
+    def _marker(self, n: int) -> str:
+        """Line standing for folded ones."""
+        text = rf"$\cdots$ {n} line{'s' if n > 1 else ''}"
+        return self.lines.builder.new("fold", text).render()
+
     @staticmethod
     def latex_escape(input: str) -> str:
         """Escape special characters for LaTeX input."""
@@ -94,6 +738,16 @@ class DiffedFile(TextModifier):
         input = input.replace("#", r"\#")
         return input
 
+    @staticmethod
+    def split_lines(input: str) -> List[str]:
+        r"""Escaped lines of raw text.
+        Input is stripped, unless it starts with \n\n in which case \n is kept.
+        """
+        lines = dedent(DiffedFile.latex_escape(input)).strip().split("\n")
+        if input.startswith("\n\n"):
+            lines = [""] + lines
+        return lines
+
     def line_index(self, i: int = -1) -> int:
         """Convert from natural line indexing to python index.
         -1 means 'last', and 0 means 'after last'.
@@ -115,44 +769,43 @@ class DiffedFile(TextModifier):
             end = len(self.lines)
         return start, end
 
-    def __getitem__(self, i: int) -> PlaceHolder:  # Line
+    def __getitem__(self, i: int) -> DiffLineView:
         return self.lines[self.line_index(i)]
 
-    def pop(self, i: int) -> PlaceHolder:  # Line
-        return self.lines.list.pop(self.line_index(i))
+    def pop(self, i: int) -> PlaceHolder:  # DiffLine
+        return self.lines.pop(self.line_index(i))
 
-    def lines_range(self, *args, **kwargs) -> Iterable[PlaceHolder]:  # DiffLine
+    def lines_indices(self, *args, **kwargs) -> List[int]:
+        """Python indices of the lines given like in `lines_range`."""
         if len(args) == 1 and not kwargs:
             if type(i := args[0]) is int:
-                yield self[i]
-            else:
-                indices = cast(List[int], i)
-                for i in indices:
-                    yield self[i]
-        else:
-            s, e = self.line_index_range(*args, **kwargs)
-            yield from self.lines.list[s:e]
+                return [self.line_index(i)]
+            return [self.line_index(i) for i in cast(List[int], i)]
+        s, e = self.line_index_range(*args, **kwargs)
+        return list(range(len(self.lines))[s:e])
+
+    def lines_range(self, *args, **kwargs) -> Iterable[DiffLineView]:
+        for i in self.lines_indices(*args, **kwargs):
+            yield self.lines[i]
 
     def erase_lines(self, *args, **kwargs) -> "DiffedFile":
         s, e = self.line_index_range(*args, **kwargs)
-        del self.lines.list[s:e]
+        self.lines.delete(s, e)
         return self
 
     def clear(self) -> "DiffedFile":
-        self.lines.list.clear()
+        self.lines.clear()
         return self
 
     def set_mod(self, mod: str, *args, **kwargs) -> "DiffedFile":
         """Modify the state of one or several lines."""
-        for line in self.lines_range(*args, **kwargs):
-            line.mod = mod
+        self.lines.set_mods(self.lines_indices(*args, **kwargs), mod)
         return self
 
     def reset(self, mod="0") -> "DiffedFile":
         """Set all lines modes + file's."""
         self.mod = mod
-        for line in self.lines:
-            line.mod = mod
+        self.lines.set_mods(range(len(self.lines)), mod)
         return self
 
     def insert_lines(
@@ -161,31 +814,36 @@ class DiffedFile(TextModifier):
         mod: str | int = "0",
         index: int = 0,
     ) -> "DiffedFile":
-        r"""Construct the lines list from raw text.
-        Input is stripped, unless it starts with \n\n in which case \n is kept.
+        r"""Construct the lines list from raw text (see `split_lines`).
+        Given lines are copied into the columns, so later edits must go through
+        the views returned by `add_lines` instead.
         """
-        if type(input) is str:
-            lines = dedent(self.latex_escape(input)).strip().split("\n")
-            if input.startswith("\n\n"):
-                lines = [""] + lines
-            lines = [self.lines.builder.new("<nomod>", l) for l in lines]
-        elif isinstance(input, PlaceHolder):
-            lines = [input]
-        else:
-            lines = cast(List[PlaceHolder], input)
+        self.add_lines(input, mod, index)
+        return self
 
+    def add_lines(
+        self,
+        input: str | PlaceHolder | List[PlaceHolder],
+        mod: str | int = "0",
+        index: int = 0,
+    ) -> List[DiffLineView]:
+        """Same as `insert_lines`, returning views on the inserted lines."""
         if type(mod) is int:
             assert index == 0  # Don't provide two indices.
             index = mod
             mod = "0"
         mod = cast(str, mod)
 
-        for line in lines:
-            line.mod = mod
+        if type(input) is str:
+            texts = self.split_lines(input)
+        else:
+            lines = [input] if isinstance(input, PlaceHolder) else input
+            for line in cast(List[PlaceHolder], lines):
+                line.mod = mod
+            texts = [line.text for line in cast(List[PlaceHolder], lines)]
 
         i = self.line_index(index)
-        self.lines.list[i:i] = lines
-        return self
+        return self.lines.insert(i, ((mod, text) for text in texts))
 
     def replace_in_line(
         self, i: int, pattern: str, replace: str
@@ -195,7 +853,7 @@ class DiffedFile(TextModifier):
         Return the three lines variants + a variant for after merging.
         """
         i = self.line_index(i)
-        original = self.lines.list.pop(i)
+        original = self.lines.pop(i)
         before, after, merged = (original.copy() for _ in range(3))
         before.mod = "-"
         after.mod = "+"
@@ -214,27 +872,29 @@ class DiffedFile(TextModifier):
                     rep = r"\dhi{" + rep + "}"
                 line.text = t[:s] + rep + t[e:]
 
-        self.lines.list[i:i] = [before, after]
+        self.lines.insert(i, ((l.mod, l.text) for l in (before, after)))
         return tuple(l.copy() for l in (original, before, after, merged))
 
     def populate(self, other: "DiffedFile") -> "DiffedFile":
         """Import all lines and mods, from another diffed file."""
-        self.clear()
-        for line in other.lines:
-            self.lines.append(line.copy())
+        self.lines.populate(other.lines)
         self.mod = other.mod
         return self
 
     def mark_lines(self, *args, **kwargs) -> "DiffedFile":
         r"""Wrap whole lines into \dhi{}."""
-        for line in self.lines_range(*args, **kwargs):
-            line.text = r"\dhi{" + line.text + "}"
+        text = self.lines.text
+        indices = self.lines_indices(*args, **kwargs)
+        self.lines.set_texts({i: r"\dhi{" + text(i) + "}" for i in indices})
         return self
 
     def unmark_lines(self, *args, **kwargs) -> "DiffedFile":
         r"""Remove \dhi{} marks from the given line."""
-        for line in self.lines_range(*args, **kwargs):
-            line.text = line.text.replace(r"\dhi{", "").replace("}", "")
+        text = self.lines.text
+        indices = self.lines_indices(*args, **kwargs)
+        self.lines.set_texts(
+            {i: text(i).replace(r"\dhi{", "").replace("}", "") for i in indices}
+        )
         return self
 
     def unmark_all(self) -> "DiffedFile":
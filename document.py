@@ -1,20 +1,32 @@
 """Modifiers concerned with the global structure of the tex file to edit.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from functools import partial
+from hashlib import sha256
+import json
+from math import ceil
 import os
 from pathlib import Path
 import re
 import shutil as shu
+import subprocess
 from textwrap import dedent
-from typing import Any, Tuple
-from typing import Callable, List, Self, cast
+from typing import Any, Dict, Tuple
+from typing import Callable, Iterable, List, Self, cast
 
+from cache import StepCache
 from modifiers import (
+    AnonymousBuilders,
     MakePlaceHolder,
     PlaceHolder,
     PlaceHolderBuilder,
+    RenderCache,
     TextModifier,
-    render_method,
+    Writer,
+    render_into_method,
+    write_joined,
 )
 from steps import Step
 
@@ -27,9 +39,13 @@ class Document(TextModifier):
 
     _startmark = "% SLIDE"
     _endmark = "% ENDSLIDE"
+    _memoized = False  # Streamed to the file, only steps texts are cached.
+    _internals = TextModifier._internals + ("_steps_table",)
 
     def __init__(self, input: str):
         self.slides: List[Slide] = []
+        self._generated: Document | None = None  # Last restriction rendered.
+        self._format: Path | None = None  # Precompiled preamble, if any.
         chunks = input.split(self._startmark)
         self.head = chunks.pop(0)
         end = ""
@@ -40,7 +56,8 @@ class Document(TextModifier):
             # Match name against Slide type names to find the correct type.
             found = False
             SlideType = None
-            for SlideType in Slide.__subclasses__():
+            # (latest definitions first, in case their module has been reloaded)
+            for SlideType in reversed(Slide.__subclasses__()):
                 if name + "Slide" == SlideType.__name__:
                     found = True
                     break
@@ -52,13 +69,14 @@ class Document(TextModifier):
             self.slides.append(SlideType(name, s, self))
         self.tail = end
 
-    @render_method
-    def render(self) -> str:
-        result = self.head
+    @render_into_method
+    def render_into(self, write: Writer):
+        write(self.head)
         for slide in self.slides:
-            result += self._startmark + slide.render() + self._endmark + "\n\n"
-        result += self.tail
-        return result
+            write(self._startmark)
+            slide.render_into(write)
+            write(self._endmark + "\n\n")
+        write(self.tail)
 
     @property
     def build_folder(self) -> Path:
@@ -71,6 +89,24 @@ class Document(TextModifier):
     def genbasename(self) -> str:
         return "generated_steps"
 
+    @property
+    def shards_folder(self) -> Path:
+        r"""Isolated build directories for concurrent compilation jobs,
+        relative to the build folder so that `\input`s and pictures resolve.
+        """
+        return Path("build")
+
+    @property
+    def dependencies(self) -> List[Path]:
+        """Files that the rendered document depends on when compiled.
+        The stub main.tex is not one of them, since its head and tail are rendered.
+        """
+        build = self.build_folder
+        ignored = {"main.tex", self.texfile.name}
+        return [f for f in build.glob("*.tex") if f.name not in ignored] + [
+            f for f in Path(build, "pictures").iterdir() if f.is_file()
+        ]
+
     @property
     def texfile(self) -> Path:
         return Path(self.build_folder, self.genbasename + ".tex")
@@ -117,8 +153,7 @@ class Document(TextModifier):
                     break
             if not found:
                 raise ValueError(f"Found no such slide: {repr(slidename)}")
-            restrict = self.copy()
-            restrict.slides = [slide := restrict.slides[last_step]]
+            slide = self.slides[last_step]
             if start is None:
                 # All steps rendered.
                 selection = range(len(slide.steps))
@@ -131,14 +166,12 @@ class Document(TextModifier):
             else:
                 # Render given (inclusive) range.
                 selection = range(start - 1, stop)
-            steps = slide.steps
-            slide.steps = []
+            restrict = self.view({last_step: [slide.steps[s] for s in selection]})
             for s in selection:
-                slide.steps.append(steps[s])
                 which_rendered.append((slide.name, s + 1))
         else:
             sstart = cast(int, slidename)
-            restrict = self.copy()
+            table = self.steps_table
             # Look for a specific range of steps, starting count from first slide.
             if (sstop := start) is None:
                 # Only one desired.
@@ -149,26 +182,27 @@ class Document(TextModifier):
                 )
             elif sstop == -1:
                 # Render for current to the end.
-                selection = range(
-                    sstart - 1,
-                    sum(len(slide.steps) for slide in restrict.slides),
-                )
+                selection = range(sstart - 1, len(table))
             else:
                 # Render to the desired absolute index.
                 selection = range(sstart - 1, sstop)
-            i_abs = 0
-            for slide in restrict.slides:
-                steps = slide.steps
-                slide.steps = []
-                for step in steps:
-                    if i_abs in selection:
-                        which_rendered.append((slide.name, i_abs + 1))
-                        slide.steps.append(step)
-                    i_abs += 1
+            # Only visit selected steps.
+            selected: Dict[int, List[Step]] = {i: [] for i in range(len(self.slides))}
+            n = len(table)
+            for i_abs in range(max(selection.start, 0), min(selection.stop, n)):
+                i_slide, i_step = table[i_abs]
+                slide = self.slides[i_slide]
+                selected[i_slide].append(slide.steps[i_step])
+                which_rendered.append((slide.name, i_abs + 1))
+            restrict = self.view(selected)
 
         print(f"Render to {self.texfile}..")
         with open(self.texfile, "w") as file:
-            file.write(restrict.render())
+            restrict.render_into(file.write)
+        print(RenderCache.report())
+        print(AnonymousBuilders.report())
+        # Keep track of what has been generated in case it needs be sharded.
+        self._generated = restrict
 
         print("All the following slides/steps have been rendered:")
         current_slide = ""
@@ -194,23 +228,317 @@ class Document(TextModifier):
             res += str(previous_step)
         print(res + "\n")
 
-    def compile(self, filename: str):
+    @property
+    def steps_table(self) -> List[Tuple[int, int]]:
+        """(slide index, step index) of every step in the whole document,
+        to locate absolute step indices in constant time.
+        Only rebuilt when slides or their number of steps change.
+        """
+        key = [(id(slide), len(slide.steps)) for slide in self.slides]
+        if (cached := self.__dict__.get("_steps_table")) and cached[0] == key:
+            return cached[1]
+        table = [
+            (i_slide, i_step)
+            for i_slide, slide in enumerate(self.slides)
+            for i_step in range(len(slide.steps))
+        ]
+        self.__dict__["_steps_table"] = (key, table)
+        return table
+
+    def view(self, selection: Dict[int, List[Step]]) -> "Document":
+        """Lightweight document only rendering the selected steps
+        of the selected slides (by index), in order.
+        Slides and steps are shared with self, not copied.
+        """
+        view = copy(self)
+        view.slides = []
+        for i_slide, steps in selection.items():
+            view.slides.append(slide := copy(self.slides[i_slide]))
+            slide.steps = steps
+        return view
+
+    def step_documents(self) -> List["Document"]:
+        """One document per step with the same head and tail, in order
+        (see `view`).
+        """
+        return [
+            self.view({i_slide: [step]})
+            for i_slide, slide in enumerate(self.slides)
+            for step in slide.steps
+        ]
+
+    def compile(
+        self,
+        filename: str,
+        workers: int = 1,
+        # Number of steps per shard when compiling with several workers,
+        # default to balancing steps among workers, and 0 means one shard per slide.
+        shard_steps: int | None = None,
+        # Compile steps individually and only if they are not found in cache.
+        cache: StepCache | None = None,
+        # Start every job from a precompiled format of the preamble.
+        precompile: bool = True,
+        # Only typeset these steps of the generated file (see `select_pages`).
+        pages: str | None = None,
+    ):
         """Assuming all steps have been generated to the correct file,
         compile with latex then copy to desired location.
         """
         output = Path(filename)
+        positions = None
+        if pages:
+            assert (generated := self._generated), "Generate tex before compiling."
+            n_steps = sum(len(slide.steps) for slide in generated.slides)
+            positions = select_pages(pages, n_steps)
+
+        self._format = self.dump_format() if precompile else None
+
+        if cache:
+            self.compile_cached(output, workers, cache, positions)
+            print("done.")
+            return
+
+        if workers > 1:
+            self.compile_shards(output, workers, shard_steps, positions)
+            print("done.")
+            return
 
         print(f"Compiling {self.texfile}..")
-        current_folder = os.getcwd()
-        os.chdir(self.build_folder)
-        assert not os.system(f"lualatex --halt-on-error {self.genbasename}.tex")
-        os.chdir(current_folder)
+        command = ["lualatex", "--halt-on-error"]
+        if self._format:
+            command.append(f"--fmt=./{self._format.as_posix()}")
+        if positions is None:
+            command.append(f"{self.genbasename}.tex")
+        else:
+            command.append(f"-jobname={self.genbasename}")
+            command.append(self.selected_input(positions))
+        assert not subprocess.run(command, cwd=self.build_folder).returncode
 
         print(f"Copy to {output}..")
         shu.copy(self.pdffile, output)
 
         print("done.")
 
+    def compile_shards(
+        self,
+        output: Path,
+        workers: int,
+        shard_steps: int | None,
+        positions: List[int] | None = None,
+    ):
+        """Compile the generated steps as several concurrent jobs,
+        each typesetting its own selection of pages from the generated file
+        within its own build directory,
+        then assemble resulting pages in order.
+        """
+        assert (generated := self._generated), "Generate tex before compiling."
+        # Positions of the steps within every slide.
+        slides: List[List[int]] = []
+        n_steps = 0
+        for slide in generated.slides:
+            slides.append(list(range(n_steps + 1, n_steps + len(slide.steps) + 1)))
+            n_steps += len(slide.steps)
+        if positions is not None:
+            selected = set(positions)
+            slides = [[p for p in slide if p in selected] for slide in slides]
+            n_steps = len(positions)
+        if shard_steps is None:
+            shard_steps = ceil(n_steps / workers)
+        if shard_steps:
+            flat = [p for slide in slides for p in slide]
+            shards = [
+                flat[i : i + shard_steps] for i in range(0, len(flat), shard_steps)
+            ]
+        else:
+            shards = [slide for slide in slides if slide]
+
+        print(
+            f"Compiling {n_steps} steps as {len(shards)} shards on {workers} workers.."
+        )
+        jobs: List[Path] = []
+        for i, _ in enumerate(shards):
+            folder = Path(self.shards_folder, f"shard-{i:03}")
+            os.makedirs(Path(self.build_folder, folder), exist_ok=True)
+            jobs.append(Path(folder, "shard.tex"))
+        with ThreadPoolExecutor(workers) as pool:
+            pdfs = list(
+                pool.map(
+                    lambda job, shard: self.lualatex(
+                        job, self._format, self.selected_input(shard)
+                    ),
+                    jobs,
+                    shards,
+                )
+            )
+
+        self.assemble(pdfs, output)
+
+    def selected_input(self, positions: List[int]) -> str:
+        """Command line input typesetting only the given steps of the generated file."""
+        ranges = "".join(
+            f"\\StepRange{{{first}}}{{{last}}}"
+            for first, last in _contiguous(positions)
+        )
+        return f"\\def\\SelectedSteps{{{ranges}}}\\input{{{self.genbasename}.tex}}"
+
+    def compile_cached(
+        self,
+        output: Path,
+        workers: int,
+        cache: StepCache,
+        positions: List[int] | None = None,
+    ):
+        """Compile every generated step as its own single-page document,
+        unless the exact same one has already been compiled before.
+        """
+        assert (generated := self._generated), "Generate tex before compiling."
+
+        print("Look for steps in cache..")
+        keys = []
+        misses: Dict[str, str] = {}  # {key: text}
+        selected = None if positions is None else set(positions)
+        for position, shard in enumerate(generated.step_documents(), 1):
+            if selected is not None and position not in selected:
+                continue
+            keys.append(key := cache.key(text := shard.render()))
+            if key not in misses and not cache.get(key):
+                misses[key] = text
+
+        if misses:
+            print(f"Compiling {len(misses)} steps on {workers} workers..")
+            pdfs = self.compile_jobs([*misses.values()], "step", workers)
+            for key, pdf in zip(misses, pdfs):
+                cache.put(key, Path(self.build_folder, pdf))
+
+        self.assemble(
+            [Path(os.path.relpath(cache.path(k), self.build_folder)) for k in keys],
+            output,
+        )
+
+        if evicted := cache.evict():
+            print(f"Evicted {len(evicted)} steps from cache.")
+        print(cache.report())
+
+    def compile_jobs(self, texts: List[str], prefix: str, workers: int) -> List[Path]:
+        """Write every text within its own folder and compile them concurrently.
+        Return paths to the resulting pdfs, relative to the build folder.
+        """
+        jobs: List[Path] = []
+        for i, text in enumerate(texts):
+            folder = Path(self.shards_folder, f"{prefix}-{i:03}")
+            os.makedirs(Path(self.build_folder, folder), exist_ok=True)
+            texfile = Path(folder, prefix + ".tex")
+            with open(Path(self.build_folder, texfile), "w") as file:
+                file.write(text)
+            jobs.append(texfile)
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(partial(self.lualatex, fmt=self._format), jobs))
+
+    def assemble(self, pdfs: List[Path], output: Path):
+        """Concatenate all pages from the given pdfs (relative to build folder)
+        into the output file.
+        """
+        print(f"Assemble {len(pdfs)} documents..")
+        assemble = Path(self.shards_folder, "assemble.tex")
+        with open(Path(self.build_folder, assemble), "w") as file:
+            file.write(
+                "\\documentclass{article}\n"
+                "\\usepackage{pdfpages}\n"
+                "\\begin{document}\n"
+                + "".join(
+                    f"\\includepdf[pages=-, fitpaper]{{{pdf.as_posix()}}}\n"
+                    for pdf in pdfs
+                )
+                + "\\end{document}\n"
+            )
+        pdf = self.lualatex(assemble)
+
+        print(f"Copy to {output}..")
+        shu.copy(Path(self.build_folder, pdf), output)
+
+    @property
+    def preamble(self) -> str:
+        return self.head.split(r"\begin{document}", 1)[0]
+
+    def dump_format(self) -> Path | None:
+        """Precompile the preamble into a lualatex format, unless it's already done.
+        The format is invalidated whenever the preamble,
+        its dependencies or lualatex itself change.
+        Return path to the format relative to the build folder,
+        or None if it could not be produced.
+        """
+        h = sha256(self.preamble.encode())
+        for file in sorted(self.dependencies):
+            if file.suffix == ".tex":
+                with open(file, "rb") as f:
+                    h.update(f.read())
+        if lualatex := shu.which("lualatex"):
+            h.update(f"{lualatex}:{os.stat(lualatex).st_mtime}".encode())
+        name = f"preamble-{h.hexdigest()[:16]}"
+        fmt = Path(self.shards_folder, name + ".fmt")
+        if os.path.exists(Path(self.build_folder, fmt)):
+            return fmt
+
+        print("Precompile preamble..")
+        folder = Path(self.build_folder, self.shards_folder)
+        os.makedirs(folder, exist_ok=True)
+        for stale in folder.glob("preamble-*.fmt"):
+            os.remove(stale)
+        texfile = Path(self.shards_folder, "preamble.tex")
+        with open(Path(self.build_folder, texfile), "w") as file:
+            file.write(self.preamble + "\\begin{document}\n\\end{document}\n")
+        process = subprocess.run(
+            [
+                "lualatex",
+                "-ini",
+                f"-jobname={name}",
+                f"--output-directory={self.shards_folder}",
+                "--interaction=nonstopmode",
+                "&lualatex",
+                "mylatexformat.ltx",
+                texfile.as_posix(),
+            ],
+            cwd=self.build_folder,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+        )
+        if process.returncode or not os.path.exists(Path(self.build_folder, fmt)):
+            log = Path(self.build_folder, self.shards_folder, name + ".log")
+            print(f"Could not precompile preamble (see {log}), compile without.")
+            return None
+        return fmt
+
+    def lualatex(
+        self,
+        texfile: Path,
+        fmt: Path | None = None,
+        input: str | None = None,
+    ) -> Path:
+        """Compile one file from within the build folder,
+        with outputs isolated next to it,
+        possibly starting from the given format.
+        If an input is given, it's compiled instead, with outputs named after texfile.
+        Return path to the resulting pdf, relative to the build folder.
+        """
+        folder = texfile.parent
+        process = subprocess.run(
+            ["lualatex"]
+            + ([f"--fmt=./{fmt.as_posix()}"] if fmt else [])
+            + [
+                "--halt-on-error",
+                "--interaction=nonstopmode",
+                f"--output-directory={folder}",
+            ]
+            + ([f"-jobname={texfile.stem}", input] if input else [texfile.as_posix()]),
+            cwd=self.build_folder,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+        )
+        if process.returncode:
+            log = Path(self.build_folder, texfile.with_suffix(".log"))
+            raise RuntimeError(f"Compilation of {texfile} failed, see {log}.")
+        return texfile.with_suffix(".pdf")
+
 
 SlideHeaderModifier, SlideHeader = MakePlaceHolder(
     "SlideHeader",
@@ -236,10 +564,18 @@ class Slide(TextModifier):
     during the "animate" function, a process called 'split'.
     """
 
+    _memoized = False  # Like the document.
+
+    # Names of the data returned by `animate` and of the data it expects,
+    # so that animations are scheduled after the ones they depend on.
+    outputs: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ()
+
     def __init__(self, name: str, input: str, document: Document):
         """Assume there is only one step during parsing."""
         self._document = document
         self.name = name
+        self.stub = input  # (to tell whether it changed since last animation)
         # Split on \Step command but preserve options.
         prefix = re.compile(r"\\Step(\[.*?\])?{")
         head, options, body = (
@@ -249,7 +585,7 @@ class Slide(TextModifier):
         # Match name against Step type names to find the correct type.
         found = False
         StepType = None
-        for StepType in Step.__subclasses__():
+        for StepType in reversed(Step.__subclasses__()):
             if name + "Step" == StepType.__name__:
                 found = True
                 break
@@ -272,13 +608,13 @@ class Slide(TextModifier):
         self._document = doc
         return new
 
-    @render_method
-    def render(self) -> str:
-        return " {}\n{}\n{} ".format(
-            self.name,
-            self.header.render(),
-            "\n".join(s.render() for s in self.steps),
-        )
+    @render_into_method
+    def render_into(self, write: Writer):
+        write(f" {self.name}\n")
+        self.header.render_into(write)
+        write("\n")
+        write_joined(write, "\n", self.steps)
+        write(" ")
 
     def pop_step(self) -> Step:
         """Useful to start from what's initially in the stub document
@@ -287,15 +623,17 @@ class Slide(TextModifier):
         return self.steps.pop()
 
     def add_step(self, step: Step):
-        """Copy current state and record into the document."""
-        self.steps.append(step.copy())
+        """Snapshot current state and record into the document."""
+        self.steps.append(step.snapshot())
 
     def animate(self, *args, **kwargs) -> Any:
         """Override to construct individual steps from the current ones.
         Only called once during the generation process,
         in a state where only the stub step(s) are present.
         Default to doing nothing.
-        Return possible interesting data for later use by the other slides.
+        Return possible interesting data for later use by the other slides
+        (one value per name in `outputs`, as a tuple if there are several),
+        and expect data returned by the other slides as named in `inputs`.
         """
         pass
 
@@ -315,8 +653,10 @@ class Slide(TextModifier):
         slides = self._document.slides
         i = slides.index(self)
         # Insert a copy with only one step right after self.
+        steps, self.steps = self.steps, []  # (don't copy them)
         fork = self.copy()
-        fork.steps = [step.copy()] if step else []
+        self.steps = steps
+        fork.steps = [step.snapshot()] if step else []
         fork.name = name
         fork.header.title = title if title else self.header.title
         fork.header.subtitle = subtitle if subtitle else self.header.subtitle
@@ -324,8 +664,126 @@ class Slide(TextModifier):
         return fork
 
 
+class MacroIndex(object):
+    r"""Every `\NewDocumentCommand` / `\newcommand` signature found in *.tex files
+    along with their special comment lines, scanned once into a single index.
+    The index is cached on disk with files sizes and modification times,
+    so that only new or modified files are read again.
+    """
+
+    # Most generic form with NewDocumentCommand.
+    needle_ndc = re.compile(
+        r"%\s*((?:\[.*?]\s*)*)"  # Optional arguments names.
+        r"((?:{.*?}\s*)*)"  # Positional arguments names.
+        r"\\NewDocumentCommand{\\([a-zA-Z@]+)}"  # Command name.
+        r"{\s*((?:O{.*?}\s*)*)"  # Optional argumens values.
+        r"((?:\+?m\s*)*)}"  # Mandatory arguments (no actual information except number).
+    )
+    # Less generic form with newcommand and only positional arguments.
+    needle_nc = re.compile(
+        r"%\s*((?:{.*?}\s*)*)"  # Positional arguments names.
+        r"\\newcommand{\\([a-zA-Z@]+)}"  # Command name.
+        r"\[(.*?)]"  # Number of arguments.
+    )
+
+    def __init__(self, root: Path, cache: Path, ignored: Iterable[Path] = ()):
+        self.root = root
+        self.cache = cache
+        # Generated files and folders, never holding definitions of their own.
+        self.ignored = [Path(root, i) for i in ignored]
+        # {file: {"stamp": [size, mtime], "ndc": {name: groups}, "nc": {...}}}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.scanned = False
+
+    def scan(self):
+        """Refresh index from the cache and the files modified since."""
+        cached = {}
+        if os.path.exists(self.cache):
+            with open(self.cache, "r") as file:
+                cached = json.load(file)
+        files = {}
+        modified = False
+        for path in self.sources():
+            stat = path.stat()
+            stamp = [stat.st_size, stat.st_mtime_ns]
+            key = path.as_posix()
+            if (entry := cached.get(key)) and entry["stamp"] == stamp:
+                files[key] = entry
+                continue
+            with open(path, "r") as file:
+                content = file.read()
+            files[key] = {"stamp": stamp, "ndc": {}, "nc": {}}
+            # Only first definition within one file is relevant.
+            for m in self.needle_ndc.finditer(content):
+                onames, pnames, name, ovalues, pnumber = m.groups()
+                files[key]["ndc"].setdefault(name, [onames, pnames, ovalues, pnumber])
+            for m in self.needle_nc.finditer(content):
+                pnames, name, pnumber = m.groups()
+                files[key]["nc"].setdefault(name, [pnames, pnumber])
+            modified = True
+        if modified or files.keys() != cached.keys():
+            os.makedirs(self.cache.parent, exist_ok=True)
+            with open(self.cache, "w") as file:
+                json.dump(files, file)
+        self.files = files
+        self.scanned = True
+
+    def sources(self) -> Iterable[Path]:
+        """Source .tex files, outside of ignored paths."""
+        for path in self.root.rglob("*.tex"):
+            if not any(path == i or i in path.parents for i in self.ignored):
+                yield path
+
+    def find(self, name: str) -> Tuple[str, List[str]] | None:
+        """Groups of the first definition found, with the form used ("ndc"/"nc")."""
+        if not self.scanned:
+            self.scan()
+        for entry in self.files.values():
+            for form in ("ndc", "nc"):
+                if groups := entry[form].get(name):
+                    return form, groups
+        return None
+
+
+macros = MacroIndex(
+    Path("."),
+    Path("tex", "build", "macros.json"),
+    ignored=[
+        Path("tex", "build"),
+        Path("tex", "cache"),
+        Path("tex", "generated_steps.tex"),
+    ],
+)
+
+
+def select_pages(pages: str, n: int) -> List[int]:
+    """Positions (1-starting) of the steps selected among n
+    by a specification like '5-9,12,40-' (open ranges go to the end).
+    """
+    positions: List[int] = []
+    for spec in pages.split(","):
+        first, _, last = spec.strip().partition("-")
+        first = int(first)
+        last = first if not _ else int(last) if last else n
+        if not 1 <= first <= last <= n:
+            raise ValueError(f"Invalid pages range {repr(spec)} among {n} steps.")
+        positions.extend(range(first, last + 1))
+    return sorted(set(positions))
+
+
+def _contiguous(positions: List[int]) -> List[Tuple[int, int]]:
+    """Compress sorted positions into (first, last) ranges."""
+    ranges: List[Tuple[int, int]] = []
+    for p in positions:
+        if ranges and ranges[-1][1] == p - 1:
+            ranges[-1] = (ranges[-1][0], p)
+        else:
+            ranges.append((p, p))
+    return ranges
+
+
 def FindPlaceHolder(name: str) -> Tuple[type, PlaceHolderBuilder[PlaceHolder]]:
-    r"""Scan *.tex files until the given name is found inside a `\NewDocumentCommand`.
+    r"""Look the given name up for a `\NewDocumentCommand` within *.tex files.
     Parse it to construct the correct pattern / options to `MakePlaceHolder()`.
     Use special comments on top of the command to retrieve arguments / fields names.
     `O{default}` arguments become options with the given default value,
@@ -348,69 +806,43 @@ def FindPlaceHolder(name: str) -> Tuple[type, PlaceHolderBuilder[PlaceHolder]]:
 
     """
 
-    # Most generic form with NewDocumentCommand.
-    needle_ndc = re.compile(
-        r"%\s*((?:\[.*?]\s*)*)"  # Optional arguments names.
-        r"((?:{.*?}\s*)*)"  # Positional arguments names.
-        r"\\NewDocumentCommand{\\" + name + "}"  # Command name.
-        r"{\s*((?:O{.*?}\s*)*)"  # Optional argumens values.
-        r"((?:\+?m\s*)*)}"  # Mandatory arguments (no actual information except number).
-    )
-    # Less generic form with newcommand and only positional arguments.
-    needle_nc = re.compile(
-        r"%\s*((?:{.*?}\s*)*)"  # Positional arguments names.
-        r"\\newcommand{\\" + name + "}"  # Command name.
-        r"\[(.*?)]"  # Number of arguments.
-    )
-
-    found = False
-    onames = pnames = ovalues = pnumber = ""
-    for file in Path(".").rglob("*.tex"):
-
-        with open(file, "r") as file:
-            content = file.read()
-
-        if m := needle_ndc.search(content):
-            found = True
-            # Extract all information from the match.
-            onames, pnames, ovalues, pnumber = m.groups()
-            pnumber = len(l := pnumber.strip().split())
-            assert set(l).issubset({"m", "+m"})
-
-        elif m := needle_nc.search(content):
-            found = True
-            pnames, pnumber = m.groups()
-            pnumber = int(pnumber)
-
-        if found:
-
-            # Extract all informations from either match.
-            onames, pnames, ovalues = (
-                [r.rsplit(c, 1)[0] for r in raw.strip().split(o)[1:]]
-                for (raw, (o, c)) in zip(
-                    (onames, pnames, ovalues), ("[]", "{}", ("O{", "}"))
-                )
-            )
+    if not (found := macros.find(name)):
+        raise ValueError(
+            f"Could not find `\\NewDocumentCommand{{\\{name}}}` "
+            f"or `\\newcommand{{\\{name}}}` in .tex files? "
+            f"At least not associated with the appropriate special comment line."
+        )
 
-            # Check that parameters numbers are consistent with each other.
-            assert pnumber == len(pnames)
-            assert len(onames) == len(ovalues)
+    form, groups = found
+    onames = ovalues = ""
+    if form == "ndc":
+        # Extract all information from the match.
+        onames, pnames, ovalues, pnumber = groups
+        pnumber = len(l := pnumber.strip().split())
+        assert set(l).issubset({"m", "+m"})
+    else:
+        pnames, pnumber = groups
+        pnumber = int(pnumber)
+
+    # Extract all informations from either match.
+    onames, pnames, ovalues = (
+        [r.rsplit(c, 1)[0] for r in raw.strip().split(o)[1:]]
+        for (raw, (o, c)) in zip((onames, pnames, ovalues), ("[]", "{}", ("O{", "}")))
+    )
 
-            # Ready to construct associated python types.
-            pattern = (
-                "\\"
-                + name
-                + "".join(f"[<{o}>]" for o in onames)
-                + "".join(f"{{<{p}>}}" for p in pnames)
-            )
-            options = {k: v for k, v in zip(onames, ovalues)}
-            return MakePlaceHolder(name, pattern, **options)
+    # Check that parameters numbers are consistent with each other.
+    assert pnumber == len(pnames)
+    assert len(onames) == len(ovalues)
 
-    raise ValueError(
-        f"Could not find `\\NewDocumentCommand{{\\{name}}}` "
-        f"or `\\newcommand{{\\{name}}}` in .tex files? "
-        f"At least not associated with the appropriate special comment line."
+    # Ready to construct associated python types.
+    pattern = (
+        "\\"
+        + name
+        + "".join(f"[<{o}>]" for o in onames)
+        + "".join(f"{{<{p}>}}" for p in pnames)
     )
+    options = {k: v for k, v in zip(onames, ovalues)}
+    return MakePlaceHolder(name, pattern, **options)
 
 
 # Common commands.
@@ -0,0 +1,98 @@
+"""Read the history of an actual git repository,
+to draw it with `Repo.import_git` instead of crafting it commit by commit.
+Everything is read from `git` subprocesses,
+streamed line by line so only the commits kept are ever held in memory.
+"""
+
+from pathlib import Path
+import re
+import subprocess
+import tempfile
+from typing import Dict, Iterator, List, Tuple
+
+
+def git(folder: Path | str, *args: str, check: bool = True) -> Iterator[str]:
+    """Stream lines output by a git command run within the folder,
+    raising if it fails unless not checked.
+    """
+    # (a file rather than a pipe, which git could fill and block on while we read)
+    with tempfile.TemporaryFile("w+") as errors:
+        process = subprocess.Popen(
+            ["git", "-C", str(folder), *args],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=errors,
+            text=True,
+        )
+        stdout = process.stdout
+        assert stdout
+        finished = False
+        try:
+            for line in stdout:
+                yield line.rstrip("\n")
+            finished = True
+        finally:
+            if not finished:
+                # The consumer stopped early: git is killed on purpose.
+                process.kill()
+            stdout.close()
+            process.wait()
+        if check and process.returncode != 0:
+            errors.seek(0)
+            raise RuntimeError(f"git {' '.join(args)} failed: {errors.read().strip()}")
+
+
+def commits(
+    folder: Path | str,
+    *revisions: str,
+    limit: int | None = None,
+) -> Iterator[Tuple[str, str, List[str], str]]:
+    """Full hash, short hash, full parents hashes and subject of every commit
+    selected by the revisions (like `main`, `--all` or `v1.0..feature`),
+    parents first, only the latest ones if limited.
+    """
+    args = ["log", "--topo-order", "--reverse", "--format=%H %h %P%x00%s"]
+    if limit is not None:
+        args.append(f"--max-count={limit}")
+    args.extend(revisions or ("HEAD",))
+    args.append("--")  # (revisions are no paths)
+    for line in git(folder, *args):
+        hashes, subject = line.split("\0", 1)
+        full, short, *parents = hashes.split()
+        yield full, short, parents, subject
+
+
+def refs(folder: Path | str) -> Iterator[Tuple[str, str, bool]]:
+    """Short name, full hash and whether remote-tracking,
+    of every local and remote-tracking branch.
+    """
+    format = "--format=%(refname) %(objectname) %(symref)"
+    for line in git(folder, "for-each-ref", format, "refs/heads", "refs/remotes"):
+        ref, hash, symref = (line + " ").split(" ", 2)
+        if symref.strip():  # (skip `origin/HEAD`)
+            continue
+        remote = ref.startswith("refs/remotes/")
+        name = ref.removeprefix("refs/remotes/" if remote else "refs/heads/")
+        yield name, hash, remote
+
+
+def head(folder: Path | str) -> Tuple[str | None, str | None]:
+    """Branch checked out (none if detached) and full hash of the commit checked out
+    (none if there is no commit yet).
+    """
+    branch = list(git(folder, "symbolic-ref", "-q", "--short", "HEAD", check=False))
+    hash = list(git(folder, "rev-parse", "-q", "--verify", "HEAD", check=False))
+    return (branch[0] if branch else None), (hash[0] if hash else None)
+
+
+_specials = re.compile(r"[\\{}$&#^_%~]")
+_replacements: Dict[str, str] = {
+    "\\": r"\textbackslash{}",
+    "^": r"\textasciicircum{}",
+    "~": r"\textasciitilde{}",
+}
+
+
+def latex_escape(input: str) -> str:
+    """Escape every special character of a commit message for LaTeX input."""
+    return _specials.sub(lambda m: _replacements.get(c := m[0], "\\" + c), input)
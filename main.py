@@ -2,112 +2,263 @@
 and duplicate / modify them for animation.
 """
 
+from argparse import ArgumentParser
+import importlib
+import os
 from pathlib import Path
-from typing import Tuple, cast
+import sys
+import time
+import traceback
+from typing import Dict, Tuple
 
+from animation import Animation, animate
+from cache import AnimationCache, StepCache
 from clients import ClientsSlide
 from conflicts import ConflictsSlide
-from document import Document
-from modifiers import Constant
+from document import Document, macros
+from modifiers import Constant, RenderCache
 from pizzas import PizzasSlide
 from remote import RemoteSlide
 from staging import StagingSlide
 from title import TitleSlide
 from transition import TransitionSlide
 
-main_tex = Path("tex", "main.tex")
-with open(main_tex, "r") as file:
-    content = file.read()
-
-doc = Document(content)
-
-# Extract all slides individually.
-(title, transition, clients, pizzas, stage, remote, conflicts) = cast(
-    Tuple[
-        TitleSlide,
-        TransitionSlide,
-        ClientsSlide,
-        PizzasSlide,
-        StagingSlide,
-        RemoteSlide,
-        ConflictsSlide,
-    ],
-    doc.slides,
+parser = ArgumentParser(description="Generate and compile the slideshow.")
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of concurrent animation / lualatex jobs "
+    "(sharded compilation if > 1).",
+)
+parser.add_argument(
+    "--shard-steps",
+    type=int,
+    default=None,
+    help="Number of steps per compilation shard "
+    "(default to balancing among jobs, 0 for one shard per slide).",
+)
+parser.add_argument(
+    "--cache",
+    action="store_true",
+    help="Compile steps individually, only if not found in cache.",
+)
+parser.add_argument(
+    "--cache-size",
+    type=int,
+    default=500,
+    help="Maximum size of the steps cache (MB).",
+)
+parser.add_argument(
+    "--no-format",
+    action="store_true",
+    help="Don't precompile the preamble into a lualatex format.",
+)
+parser.add_argument(
+    "--pages",
+    default=None,
+    help="Only typeset these steps of the generated file, like '5-9,12,40-'.",
+)
+parser.add_argument(
+    "--no-render-cache",
+    action="store_true",
+    help="Re-render every modifier from scratch instead of reusing cached text.",
+)
+parser.add_argument(
+    "--no-animation-cache",
+    action="store_true",
+    help="Animate every slide instead of loading unchanged ones from cache.",
 )
+parser.add_argument(
+    "--watch",
+    action="store_true",
+    help="Keep running, and rebuild affected slides whenever sources change.",
+)
+args = parser.parse_args()
+RenderCache.enabled = not args.no_render_cache
+
+main_tex = Path("tex", "main.tex")
+animations_cache = Path("tex", "cache", "animations")
+
+def arrange(doc: Document):
+    """Insert transitions and number slides and steps, once all are animated."""
+
+    # Here are the new slides now that some have been 'split'ted.
+    (
+        title,
+        transition,
+        clients,
+        pizzas,
+        stage,
+        remote,
+        notalone,
+        collaborate,
+        fork,
+        fusion,
+        propagate_merge,
+        propagate_rebase,
+        conflicts,
+    ) = doc.slides
+
+    # Reorganize, inserting transitions.
+    ts = lambda t: transition.split("Transition", t, step=transition.steps[0].copy())
+    doc.slides = [
+        title,
+        ts("The Various Git Clients"),
+        clients,
+        ts("Pizzas with Git"),
+        pizzas,
+        ts("How to Make a Commit"),
+        stage,
+        ts("Share Your Project Online"),
+        remote,
+        ts("You're Not Alone"),
+        notalone,
+        (coll := ts("Collaborate")),
+        collaborate,
+        ts("Collaboration Divergence"),
+        fork,
+        ts("Conflicts"),
+        conflicts,
+        ts("Integrate Diverging Works"),
+        fusion,
+        propagate_merge,
+        propagate_rebase,
+    ]
+
+    # Setup slides numbers and progress.
+    total = len(doc.slides)
+    n_steps = sum(len(slide.steps) for slide in doc.slides)
+    i_slide = 1
+    i_step = 1
+    for slide in doc.slides:
+        if not isinstance(slide, TransitionSlide):
+            slide.header.page = str(i_slide)
+            i_slide += 1
+        for step in slide.steps:
+            step.intro.progress = f"{i_step}/{n_steps}"
+            i_step += 1
 
-# Animate, taking care of dependencies among slides.
-clients.animate()
-repo, filetree, diffs = pizzas.animate()
-stage.animate()
-remote.animate(repo, filetree, diffs)
-conflicts.animate()
-
-# Here are the new slides now that some have been 'split'ted.
-(
-    title,
-    transition,
-    clients,
-    pizzas,
-    stage,
-    remote,
-    notalone,
-    collaborate,
-    fork,
-    fusion,
-    propagate_merge,
-    propagate_rebase,
-    conflicts,
-) = doc.slides
-
-# Reorganize, inserting transitions.
-ts = lambda t: transition.split("Transition", t, step=transition.steps[0].copy())
-doc.slides = [
-    title,
-    ts("The Various Git Clients"),
-    clients,
-    ts("Pizzas with Git"),
-    pizzas,
-    ts("How to Make a Commit"),
-    stage,
-    ts("Share Your Project Online"),
-    remote,
-    ts("You're Not Alone"),
-    notalone,
-    (coll := ts("Collaborate")),
-    collaborate,
-    ts("Collaboration Divergence"),
-    fork,
-    ts("Conflicts"),
-    conflicts,
-    ts("Integrate Diverging Works"),
-    fusion,
-    propagate_merge,
-    propagate_rebase,
-]
-
-# Setup slides numbers and progress.
-total = len(doc.slides)
-n_steps = sum(len(slide.steps) for slide in doc.slides)
-i_slide = 1
-i_step = 1
-for slide in doc.slides:
-    if not isinstance(slide, TransitionSlide):
-        slide.header.page = str(i_slide)
-        i_slide += 1
-    for step in slide.steps:
-        step.intro.progress = f"{i_step}/{n_steps}"
-        i_step += 1
-
-# Small fun on this specific transition.
-step = coll.steps[0].copy() # (here so the progress bar does not move during transition)
-step.add_epilog(
-    Constant(
-        r"\AutomaticCoordinates{c}{0, -.45}" + "\n"
-        r"\node at (c) {\PicContact{!}{12cm}};",
+    # Small fun on this specific transition.
+    step = coll.steps[0].copy() # (here so the progress bar does not move during transition)
+    step.add_epilog(
+        Constant(
+            r"\AutomaticCoordinates{c}{0, -.45}" + "\n"
+            r"\node at (c) {\PicContact{!}{12cm}};",
+        )
     )
-)
-coll.add_step(step)
+    coll.add_step(step)
+
+
+def build(previous: Dict[str, Animation]) -> Dict[str, Animation]:
+    """Generate and compile the slideshow from the current sources."""
+    RenderCache.reset()
+    with open(main_tex, "r") as file:
+        content = file.read()
+    doc = Document(content)
+    animations = animate(
+        doc,
+        previous,
+        workers=args.jobs,
+        cache=None if args.no_animation_cache else AnimationCache(animations_cache),
+    )
+    arrange(doc)
+    doc.generate_tex()
+    # Only compile steps changed since last build when watching.
+    cache = (
+        StepCache(Path("tex", "cache"), doc.dependencies, args.cache_size * 2**20)
+        if args.cache or args.watch
+        else None
+    )
+    doc.compile(
+        "res.pdf",
+        workers=args.jobs,
+        shard_steps=args.shard_steps,
+        cache=cache,
+        precompile=not args.no_format,
+        pages=args.pages,
+    )
+    return animations
+
+
+def sources() -> Dict[Path, int]:
+    """Modification times of every watched file."""
+    generated = Path("tex", "generated_steps.tex")
+    files = [
+        *Path("tex").glob("*.tex"),
+        *Path("tex", "pictures").glob("*"),
+        *Path(".").glob("*.py"),
+    ]
+    stamps = {}
+    for file in files:
+        if file != generated:
+            try:
+                stamps[file] = file.stat().st_mtime_ns
+            except FileNotFoundError:  # (removed meanwhile)
+                pass
+    return stamps
+
+
+def signatures() -> Dict[str, Tuple]:
+    """Macros definitions that placeholders have been made from."""
+    return {file: (e["ndc"], e["nc"]) for file, e in macros.files.items()}
+
+
+def restart():
+    """Start over in a fresh process, when changes are too deep to track."""
+    print("Restart.")
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def watch(animations: Dict[str, Animation], period: float = 0.5):
+    """Rebuild whenever sources change, keeping the process warm in-between:
+    a modified slide module is reloaded and only its slides
+    (and the ones depending on them) are animated again,
+    a modified stub section is animated again,
+    any other modified tex file or picture is only recompiled.
+    Modifying other python modules or macros signatures requires a restart.
+    """
+    stamps = sources()
+    print("Watching for changes..")
+    while True:
+        time.sleep(period)
+        if (new := sources()) == stamps:
+            continue
+        changed = {f for f in stamps.keys() | new.keys() if stamps.get(f) != new.get(f)}
+        stamps = new
+        print(f"Changed: {', '.join(sorted(f.as_posix() for f in changed))}.")
+        try:
+            modules = {f.stem for f in changed if f.suffix == ".py"}
+            slide_modules = {a.module for a in animations.values()}
+            # (this very script runs as __main__, not under its own name)
+            itself = Path(__file__).resolve() in {f.resolve() for f in changed}
+            if itself or modules & sys.modules.keys() - slide_modules:
+                restart()
+            for module in modules & slide_modules:
+                importlib.reload(sys.modules[module])
+            if tex := [f.as_posix() for f in changed if f.suffix == ".tex"]:
+                before = signatures()
+                macros.scan()
+                after = signatures()
+                if any(before.get(f) != after.get(f) for f in tex):
+                    restart()
+            animations = build(animations)
+        except Exception:
+            traceback.print_exc()
+        print("Watching for changes..")
 
-doc.generate_tex()
 
-doc.compile("res.pdf")
+if __name__ == "__main__":
+    if args.watch:
+        try:
+            animations = build({})
+        except Exception:
+            traceback.print_exc()
+            animations = {}
+        try:
+            watch(animations)
+        except KeyboardInterrupt:
+            pass
+    else:
+        build({})
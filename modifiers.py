@@ -4,10 +4,43 @@ of every slide we need to animate, so we can parse it easily.
 
 from copy import deepcopy
 import re
-from typing import Callable, Dict, Generic, List, Self, Set, Tuple, TypeVar, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    NamedTuple,
+    Self,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    cast,
+)
 
 
 TM = TypeVar("TM", bound="TextModifier")
+Writer = Callable[[str], Any]  # Receives rendered text chunk by chunk.
+
+_missing = object()  # Sentinel for values absent from previous snapshots.
+
+
+class RenderCache(object):
+    """Global switch and statistics for the memoization of rendered modifiers."""
+
+    enabled = True
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def reset(cls):
+        cls.hits = cls.misses = 0
+
+    @classmethod
+    def report(cls) -> str:
+        return f"Render cache: {cls.hits} hits, {cls.misses} misses."
 
 
 class TextModifier(object):
@@ -34,14 +67,107 @@ class TextModifier(object):
     # Otherwise silent.
     _opacity = 1.0  # Only used in rendering, retro-parsing *may* fail if <1.
 
+    # Bookkeeping members, not part of the modifier state:
+    # they are neither copied nor recorded into snapshots.
+    _internals: Tuple[str, ...] = ("_last_snapshot", "_cache", "_parents")
+    # Last rendered text, dropped (with parents') as soon as self is modified.
+    _cache: str | None = None
+    # Lower on huge modifiers so their text is only streamed, never retained.
+    _memoized = True
+    # Modifiers whose cached rendering depends on self.
+    _parents: Set["TextModifier"]
+    # Members only ever replaced, never modified in place, and holding no modifiers:
+    # they are shared as is with snapshots instead of being walked item by item.
+    _shared: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Whichever of render/render_into is the most derived one
+        is the actual rendering, and the other one defers to it.
+        """
+        super().__init_subclass__(**kwargs)
+        if "render" in cls.__dict__ and "render_into" not in cls.__dict__:
+            cls.render_into = TextModifier.render_into
+        elif "render_into" in cls.__dict__ and "render" not in cls.__dict__:
+            cls.render = TextModifier.render
+
     def render(self) -> str:
-        raise NotImplementedError(f"Cannot render text for {type(self).__name__}.")
+        """Thin wrapper collecting all chunks streamed by render_into."""
+        chunks: List[str] = []
+        self.render_into(chunks.append)
+        return "".join(chunks)
+
+    def render_into(self, write: Writer):
+        """Stream rendered text into the writer.
+        Default to rendering as a whole, for modifiers only overriding render().
+        """
+        if type(self).render is TextModifier.render:
+            raise NotImplementedError(f"Cannot render text for {type(self).__name__}.")
+        write(self.render())
+
+    def __setattr__(self, name: str, value: Any):
+        """Invalidate cached rendering on any actual modification,
+        and watch in-place modifications of containers.
+        """
+        if name == "__dict__":
+            # Whole state replacement.
+            self.invalidate()
+        elif name not in self._internals:
+            value = _track(value, self)
+            old = getattr(self, name, _missing)
+            if old is not value and (type(old) is not type(value) or old != value):
+                self.invalidate()
+        object.__setattr__(self, name, value)
+
+    def invalidate(self):
+        """Drop cached rendering of self and of all modifiers depending on it."""
+        d = self.__dict__
+        d.pop("_cache", None)
+        for parent in d.pop("_parents", ()):
+            parent.invalidate()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {k: v for k, v in self.__dict__.items() if k not in self._internals}
 
     def copy(self) -> Self:
         return deepcopy(self)
 
     def become(self, other):
-        self.__dict__ = deepcopy(other.__dict__)
+        self.invalidate()
+        # (containers copied from other are now owned by self)
+        self.__dict__ = deepcopy(other.__getstate__(), {id(other): self})
+
+    def snapshot(self, memo: Dict[int, Any] | None = None) -> Self:
+        """Record current state into a new value,
+        sharing every subtree unchanged since the previous snapshot of self.
+        Only nodes that have been modified in between are actually copied,
+        so snapshots must never be edited afterwards.
+        Like deepcopy, the memo preserves aliasing within the tree.
+        """
+        if memo is None:
+            memo = {}
+        if (i := id(self)) in memo:
+            return memo[i]
+        previous = self.__dict__.get("_last_snapshot")
+        old = previous.__dict__ if previous is not None else {}
+        state = {}
+        same = previous is not None
+        for k, v in self.__dict__.items():
+            if k in self._internals:
+                continue
+            before = old.get(k, _missing)
+            if k in self._shared:
+                state[k] = after = v
+            else:
+                state[k] = after = _snapshot(v, before, memo)
+            same = same and after is before
+        if same and len(state) == len(old):
+            new = cast(Self, previous)
+        else:
+            new = object.__new__(type(self))
+            new.__dict__.update(state)
+            self.__dict__["_last_snapshot"] = new
+        memo[i] = new
+        return new
 
     def on(self, on=True) -> Self:
         """Make rendered."""
@@ -133,6 +259,295 @@ class TextModifier(object):
         return self.display(0)
 
 
+def _snapshot(value: Any, before: Any, memo: Dict[int, Any]) -> Any:
+    """Snapshot any member value, returning `before` if it's equivalent.
+    Snapshotted containers are plain, untracked ones.
+    """
+    if isinstance(value, TextModifier):
+        return value.snapshot(memo)
+    if isinstance(value, list) or type(value) is tuple:
+        tp = tuple if type(value) is tuple else list
+        match = type(before) is tp and len(before) == len(value)
+        items = [
+            _snapshot(v, before[i] if match else _missing, memo)
+            for i, v in enumerate(value)
+        ]
+        if match and all(a is b for a, b in zip(items, before)):
+            return before
+        return tp(items)
+    if isinstance(value, dict):
+        match = type(before) is dict and before.keys() == value.keys()
+        items = {
+            k: _snapshot(v, before[k] if match else _missing, memo)
+            for k, v in value.items()
+        }
+        if match and all(items[k] is before[k] for k in items):
+            return before
+        return items
+    if isinstance(value, set):
+        return before if type(before) is set and before == value else set(value)
+    # Immutable leaves.
+    if before is value or (type(before) is type(value) and before == value):
+        return before
+    return value
+
+
+class _TrackedList(list):
+    """Invalidate owner modifier on in-place modification."""
+
+    _owner: TextModifier | None = None  # (None while being unpickled)
+
+    def _modified(self):
+        if self._owner is not None:
+            self._owner.invalidate()
+
+    def __setitem__(self, i, value):
+        self._modified()
+        super().__setitem__(i, _track(value, self._owner))
+
+    def __delitem__(self, i):
+        self._modified()
+        super().__delitem__(i)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def append(self, value):
+        self._modified()
+        super().append(_track(value, self._owner))
+
+    def insert(self, i, value):
+        self._modified()
+        super().insert(i, _track(value, self._owner))
+
+    def extend(self, values):
+        self._modified()
+        super().extend(_track(v, self._owner) for v in values)
+
+    def pop(self, *args):
+        self._modified()
+        return super().pop(*args)
+
+    def remove(self, value):
+        self._modified()
+        super().remove(value)
+
+    def clear(self):
+        self._modified()
+        super().clear()
+
+    def sort(self, *args, **kwargs):
+        self._modified()
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self._modified()
+        super().reverse()
+
+
+class _TrackedDict(dict):
+    """Invalidate owner modifier on in-place modification."""
+
+    _owner: TextModifier | None = None  # (None while being unpickled)
+
+    def _modified(self):
+        if self._owner is not None:
+            self._owner.invalidate()
+
+    def __setitem__(self, k, value):
+        self._modified()
+        super().__setitem__(k, _track(value, self._owner))
+
+    def __delitem__(self, k):
+        self._modified()
+        super().__delitem__(k)
+
+    def pop(self, *args):
+        self._modified()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._modified()
+        return super().popitem()
+
+    def clear(self):
+        self._modified()
+        super().clear()
+
+    def setdefault(self, k, default=None):
+        if k not in self:
+            self[k] = default
+        return self[k]
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+
+class _TrackedSet(set):
+    """Invalidate owner modifier on in-place modification."""
+
+    _owner: TextModifier | None = None  # (None while being unpickled)
+
+    def _modified(self):
+        if self._owner is not None:
+            self._owner.invalidate()
+
+    def add(self, value):
+        self._modified()
+        super().add(value)
+
+    def discard(self, value):
+        self._modified()
+        super().discard(value)
+
+    def remove(self, value):
+        self._modified()
+        super().remove(value)
+
+    def pop(self):
+        self._modified()
+        return super().pop()
+
+    def clear(self):
+        self._modified()
+        super().clear()
+
+    def update(self, *args):
+        self._modified()
+        super().update(*args)
+
+    def difference_update(self, *args):
+        self._modified()
+        super().difference_update(*args)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+
+def _track(value: Any, owner: TextModifier | None) -> Any:
+    """Wrap (possibly nested) containers so they invalidate owner when modified."""
+    if isinstance(value, TextModifier) or type(value) in (str, tuple):
+        return value
+    if isinstance(value, (_TrackedList, _TrackedDict, _TrackedSet)):
+        if owner is not None and value._owner is not owner:
+            # Transfer ownership.
+            value._owner = owner
+            for v in value.values() if isinstance(value, dict) else value:
+                _track(v, owner)
+        return value
+    if isinstance(value, list):
+        tracked = _TrackedList(_track(v, owner) for v in value)
+    elif isinstance(value, dict):
+        tracked = _TrackedDict((k, _track(v, owner)) for k, v in value.items())
+    elif isinstance(value, set):
+        tracked = _TrackedSet(value)
+    else:
+        return value
+    tracked._owner = owner
+    return tracked
+
+
+def _register(parent: TextModifier, value: Any):
+    """Mark parent as depending on all modifiers found within value."""
+    if isinstance(value, TextModifier):
+        try:
+            value._parents.add(parent)
+        except AttributeError:
+            value.__dict__["_parents"] = {parent}
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _register(parent, v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _register(parent, v)
+
+
+def _store(self: TextModifier, result: str):
+    """Cache rendered text, watching all modifiers it depends on."""
+    d = self.__dict__
+    for k, v in d.items():
+        if k not in self._internals and k not in self._shared:
+            _register(self, v)
+    d["_cache"] = result
+
+
+def memoized(render: Callable) -> Callable:
+    """Decorate render functions so the result is cached until self,
+    or any modifier in its members, is modified.
+    """
+
+    def memoized_render(self) -> str:
+        if not (RenderCache.enabled and self._memoized):
+            return render(self)
+        if (result := self._cache) is not None:
+            RenderCache.hits += 1
+            return result
+        RenderCache.misses += 1
+        _store(self, result := render(self))
+        return result
+
+    return memoized_render
+
+
+def memoized_into(render_into: Callable) -> Callable:
+    """Same as memoized, for streaming render_into methods."""
+
+    def memoized_render_into(self, write: Writer):
+        if not (RenderCache.enabled and self._memoized):
+            return render_into(self, write)
+        if (result := self._cache) is None:
+            RenderCache.misses += 1
+            chunks: List[str] = []
+            render_into(self, chunks.append)
+            _store(self, result := "".join(chunks))
+        else:
+            RenderCache.hits += 1
+        write(result)
+
+    return memoized_render_into
+
+
+def write_joined(write: Writer, separator: str, modifiers: Iterable[TextModifier]):
+    """Stream the equivalent of separator.join(m.render() for m in modifiers)."""
+    for i, m in enumerate(modifiers):
+        if i:
+            write(separator)
+        m.render_into(write)
+
+
+def _decorated_into(self: TextModifier, write: Writer, render_into: Callable):
+    """Stream render_into output within the decorations described in render_method."""
+    if not self._rendered:
+        return
+
+    if hasattr(self, "_prolog"):
+        write_joined(write, self._prolog_sep, self._prolog)
+
+    if l := self._layer:
+        write(r"\begin{pgfonlayer}{" + l + "}")
+
+    if (o := self._opacity) < 1:
+        write(r"\begin{scope}[transparency group, opacity=" + str(o) + "]\n")
+
+    render_into(self, write)
+
+    if o < 1:
+        write(r"\end{scope}" + "\n")
+
+    if self._layer:
+        write(r"\end{pgfonlayer}")
+
+    if hasattr(self, "_epilog"):
+        write_joined(write, self._epilog_sep, self._epilog)
+
+
 def render_method(render: Callable) -> Callable:
     """Decorate render functions so they take
         _rendered
@@ -143,34 +558,21 @@ def render_method(render: Callable) -> Callable:
     into account.
     """
 
-    def decorated_render(self, *args, **kwargs) -> str:
-        result = ""
-        if not self._rendered:
-            return result
-
-        if hasattr(self, "_prolog"):
-            result += self._prolog_sep.join(m.render() for m in self._prolog)
+    def decorated_render(self) -> str:
+        chunks: List[str] = []
+        _decorated_into(self, chunks.append, lambda self, write: write(render(self)))
+        return "".join(chunks)
 
-        if l := self._layer:
-            result += r"\begin{pgfonlayer}{" + l + "}"
+    return memoized(decorated_render)
 
-        if (o := self._opacity) < 1:
-            result += r"\begin{scope}[transparency group, opacity=" + str(o) + "]\n"
 
-        result += render(self, *args, **kwargs)
+def render_into_method(render_into: Callable) -> Callable:
+    """Same as render_method, for streaming render_into methods."""
 
-        if o < 1:
-            result += r"\end{scope}" + "\n"
+    def decorated_render_into(self, write: Writer):
+        _decorated_into(self, write, render_into)
 
-        if self._layer:
-            result += r"\end{pgfonlayer}"
-
-        if hasattr(self, "_epilog"):
-            result += self._epilog_sep.join(m.render() for m in self._epilog)
-
-        return result
-
-    return decorated_render
+    return memoized_into(decorated_render_into)
 
 
 class Builder(Generic[TM]):
@@ -223,6 +625,15 @@ class _ConstantBuilder(Builder[Constant]):
 ConstantBuilder = _ConstantBuilder()
 
 
+class Match(NamedTuple):
+    """Lightweight, immutable record of a successful match:
+    only groups spans within the original string are replaced on rendering.
+    """
+
+    string: str
+    spans: Tuple[Tuple[int, int], ...]
+
+
 class Regex(TextModifier):
     """Common modifier.
     Feed with a regex containing groups and their list of names.
@@ -231,32 +642,45 @@ class Regex(TextModifier):
     Provide a few TextModifier types if some members are non-leaves.
     """
 
+    _match: Match  # (see `_set_match`)
+
     def __init__(
         self,
         input: str,
-        pattern: str | re.Pattern,
+        pattern: "str | re.Pattern | LiteralPattern",
         groups: str,
         **kwargs: Builder,
     ):
-        if type(pattern) is str:
-            pattern = re.compile(pattern, re.DOTALL)
-        pattern = cast(re.Pattern, pattern)
-        if not (m := pattern.match(input)):
+        names = groups.strip().split()
+        if isinstance(pattern, LiteralPattern):
+            spans = pattern.match(input)
+        else:
+            if type(pattern) is str:
+                pattern = re.compile(pattern, re.DOTALL)
+            pattern = cast(re.Pattern, pattern)
+            m = pattern.match(input)
+            spans = m and tuple(m.span(i + 1) for i in range(len(names)))
+        if spans is None:
             raise ValueError(
                 f"The given pattern:\n{pattern.pattern}\n"
                 f"does not match input:\n{input}\n"
                 f"in Regex type {type(self).__name__}."
             )
-        self._match = m  # Members with no trailing '_' are group values.
-        for i, name in enumerate(groups.strip().split()):
-            group = cast(str, m.group(i + 1))
-            if name in kwargs:
-                group = cast(TextModifier, kwargs[name].parse(group))
-            self.__dict__[name] = group
-
-    @render_method
-    def render(self) -> str:
-        result = ""
+        self._set_match(Match(input, spans), names, kwargs)
+
+    def _set_match(self, m: Match, names: List[str], builders: Dict[str, Builder]):
+        """Record match and set groups values as members (on a fresh object)."""
+        d = self.__dict__
+        d["_match"] = m
+        string = m.string
+        for name, (s, e) in zip(names, m.spans):
+            group = None if s < 0 else string[s:e]  # (unmatched optional group)
+            if name in builders and group is not None:
+                group = cast(TextModifier, builders[name].parse(group))
+            d[name] = group  # Members with no leading '_' are groups.
+
+    @render_into_method
+    def render_into(self, write: Writer):
         m = self._match
         original = m.string
         c = 0
@@ -265,17 +689,20 @@ class Regex(TextModifier):
             for k, v in self.__dict__.items():
                 if k.startswith("_"):
                     continue
-                s, e = m.span(i + 1)
+                s, e = m.spans[i]
                 # Copy all non-grouped parts of original string.
-                result += original[c:s]
+                write(original[c:s])
                 # But skip groups and replace with new value instead.
-                result += v.render() if isinstance(v, TextModifier) else str(v)
+                if isinstance(v, TextModifier):
+                    v.render_into(write)
+                else:
+                    write(str(v))
                 c = e
                 i += 1
         except:
             raise ValueError(
                 f"{type(self).__name__}: "
-                f"could not render the following match:\n  {m.string}\n"
+                f"could not render the following match:\n  {original}\n"
                 + "with the following groups:\n  {}".format(
                     "\n  ".join(
                         f"{k}: {type(v).__name__}"
@@ -284,7 +711,7 @@ class Regex(TextModifier):
                     )
                 )
             )
-        return result + original[c:]
+        write(original[c:])
 
     # Reassure pyright with artificial __[gs]etattr__ methods.
     def __getattr__(self, name: str) -> str | TextModifier:
@@ -296,7 +723,43 @@ class Regex(TextModifier):
             raise AttributeError(str(e))
 
     def __setattr__(self, name: str, value: str | TextModifier):
-        self.__dict__[name] = value
+        super().__setattr__(name, value)
+
+
+class LiteralPattern(object):
+    """Literal chunks separated by holes, like 'head<a>sep<b>tail',
+    matching exactly like the anchored regex 'head(.*?)sep(.*?)tail$' (DOTALL)
+    but in one left-to-right pass over the input, without backtracking.
+    Lazy holes end at the first occurrence of the next chunk,
+    and the last chunk is anchored at the end of input.
+    """
+
+    def __init__(self, chunks: List[str], pattern: str):
+        self.chunks = chunks
+        self.pattern = pattern  # Equivalent regex, for error messages.
+
+    def match(self, input: str) -> Tuple[Tuple[int, int], ...] | None:
+        """Spans of the holes, or None if there is no match."""
+        head, *chunks = self.chunks
+        if not input.startswith(head):
+            return None
+        if not chunks:
+            return () if input in (head, head + "\n") else None
+        *middle, tail = chunks
+        spans = []
+        start = len(head)
+        for chunk in middle:
+            if (end := input.find(chunk, start)) < 0:
+                return None
+            spans.append((start, end))
+            start = end + len(chunk)
+        # Like '$', also match before a final newline (first, since lazy).
+        n = len(input)
+        for end, rest in ((n - len(tail) - 1, tail + "\n"), (n - len(tail), tail)):
+            if end >= start and input.endswith(rest):
+                spans.append((start, end))
+                return tuple(spans)
+        return None
 
 
 class RegexBuilder(Builder[Regex]):
@@ -330,6 +793,12 @@ class PlaceHolder(Regex):
     def __setattr__(self, name: str, value: str):
         super().__setattr__(name, value)
 
+    def __reduce_ex__(self, protocol):
+        """Types made on the fly are pickled as the arguments that made them."""
+        if (made := type(self).__dict__.get("_made_with")) is None:
+            return super().__reduce_ex__(protocol)
+        return (_new_placeholder, (made,), self.__getstate__())
+
 
 PH = TypeVar("PH", bound=PlaceHolder)
 
@@ -366,17 +835,17 @@ class PlaceHolderBuilder(Builder[PH]):
         head = chunks.pop(0)
         regex = re.escape(head)
         model = cast(str, py_escape(head))
+        literals = [head]
+        positionals: List[bool] = []
         placeholders: List[str] = []
         types: Dict[str, type] = {}
         re.compile("a\nb").match("a\nb")
         for c in chunks:
             ph, literal = c.split(">", 1)
             regex += r"(.*?)"
-            model += (
-                "{}"
-                if (ph in pos) or (auto_pos and (ph not in options))
-                else f"{{{ph}}}"
-            )
+            positional = (ph in pos) or (auto_pos and (ph not in options))
+            model += "{}" if positional else f"{{{ph}}}"
+            positionals.append(positional)
             if ph in options:
                 v = options[ph]
                 if type(v) is tuple:
@@ -388,29 +857,69 @@ class PlaceHolderBuilder(Builder[PH]):
             placeholders.append(ph)
             regex += re.escape(literal)
             model += cast(str, py_escape(literal))
+            literals.append(literal)
         self.placeholders = placeholders
         self.regex = regex + r"$"
         self.model = model
         self.types = types
+        # Faster, equivalent matcher for the regex.
+        self.matcher = LiteralPattern(literals, self.regex)
+        self.groups = " ".join(placeholders)
+        # Parsing finds the same spans as the values given to new(),
+        # unless some value contains the first character ('stop') of the next chunk.
+        # Last chunk is anchored at the end (no stop), an empty one always stops.
+        stops = [c[:1] for c in literals[1:-1]] + [None]
+        self.holes = list(zip(placeholders, positionals, literals[1:], stops))
 
     def parse(self, input: str) -> PH:
-        groups = " ".join(self.placeholders)
         return self.built_type(
             input.strip(),
-            self.regex,
-            groups,
+            self.matcher,
+            self.groups,
             **self.types,
         )
 
     def new(self, *args, **kwargs) -> PH:
+        """Same as parsing the model formatted with the given values,
+        but construct spans directly from them unless they would parse differently.
+        """
         kw = self.options.copy()
         kw.update(kwargs)
-        return self.parse(self.model.format(*args, **kw))
+        parts = [head := self.matcher.chunks[0]]
+        spans = []
+        start = len(head)
+        direct = True
+        i_arg = 0
+        for ph, positional, chunk, stop in self.holes:
+            if positional:
+                value = format(args[i_arg])
+                i_arg += 1
+            else:
+                value = format(kw[ph])
+            if stop is not None and stop in value:
+                direct = False
+            spans.append((start, end := start + len(value)))
+            parts.append(value)
+            parts.append(chunk)
+            start = end + len(chunk)
+        input = "".join(parts)
+        if not direct or input.strip() != input:
+            return self.parse(input)
+        new = cast(PH, object.__new__(self.built_type))
+        types = cast(Dict[str, Builder], self.types)
+        new._set_match(Match(input, tuple(spans)), self.placeholders, types)
+        return new
 
     def __call__(self, *args, **kwargs) -> PH:
         """Direct calls mean 'new'."""
         return self.new(*args, **kwargs)
 
+    def __reduce_ex__(self, protocol):
+        """Like the placeholders built."""
+        if (made := self.built_type.__dict__.get("_made_with")) is None:
+            return super().__reduce_ex__(protocol)
+        return (_made_builder, (made,))
+
     def __repr__(self):
         return f"{type(self).__name__}[{self.built_type.__name__}]"
 
@@ -424,16 +933,70 @@ def MakePlaceHolder(
     To clarify uses of builder, the shortest name goes to it,
     and the other is suffixed with -Modifier.
     """
-    SubPH = type(_name + "Modifier", (PlaceHolder,), {})
+    made = (_name, args, kwargs)
+    SubPH = type(_name + "Modifier", (PlaceHolder,), {"_made_with": made})
     SubPHBuilder = PlaceHolderBuilder[SubPH](SubPH, *args, **kwargs)
+    _made[(_name, args)] = SubPH, SubPHBuilder
     return SubPH, SubPHBuilder
 
 
+# Latest types and builders made, by name and pattern,
+# to find them again when unpickled (possibly within another process).
+_made: Dict[
+    Tuple[str, Tuple], Tuple[Type[PlaceHolder], PlaceHolderBuilder[PlaceHolder]]
+] = {}
+
+
+def _remake(
+    made: Tuple[str, Tuple, Dict],
+) -> Tuple[Type[PlaceHolder], PlaceHolderBuilder]:
+    name, args, kwargs = made
+    if (key := (name, args)) not in _made:
+        MakePlaceHolder(name, *args, **kwargs)
+    return _made[key]
+
+
+def _new_placeholder(made: Tuple[str, Tuple, Dict]) -> PlaceHolder:
+    SubPH = _remake(made)[0]
+    return object.__new__(SubPH)
+
+
+def _made_builder(made: Tuple[str, Tuple, Dict]) -> PlaceHolderBuilder:
+    return _remake(made)[1]
+
+
+class AnonymousBuilders(object):
+    """Process-wide cache of anonymous placeholder builders,
+    so every distinct pattern yields only one type and one matcher.
+    """
+
+    builders: Dict[str, PlaceHolderBuilder[PlaceHolder]] = {}
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def get(cls, pattern: str) -> PlaceHolderBuilder[PlaceHolder]:
+        if builder := cls.builders.get(pattern):
+            cls.hits += 1
+            return builder
+        cls.misses += 1
+        _, builder = MakePlaceHolder("Anonymous", pattern, _positionals="")
+        cls.builders[pattern] = builder
+        return builder
+
+    @classmethod
+    def report(cls) -> str:
+        return (
+            f"Anonymous placeholders: {len(cls.builders)} patterns, "
+            f"{cls.hits} hits, {cls.misses} misses."
+        )
+
+
 def AnonymousPlaceHolder(pattern, _do: str, *args, **kwargs) -> PlaceHolder:
     """Useful for one-liners,
     PlaceHolder objects that will only be parsed/created in one place.
     """
-    _, SubPHBuilder = MakePlaceHolder("Anonymous", pattern, _positionals="")
+    SubPHBuilder = AnonymousBuilders.get(pattern)
     if _do == "new":
         return SubPHBuilder.new(**kwargs)
     if _do == "parse":
@@ -490,10 +1053,10 @@ class ListOf(Generic[TM], TextModifier):
     def __getitem__(self, i):
         return self.list[i]
 
-    @render_method
-    def render(self) -> str:
-        return self.separator.join(
-            m.render() for m in [self.head] + self.list + [self.tail] if m
+    @render_into_method
+    def render_into(self, write: Writer):
+        write_joined(
+            write, self.separator, (m for m in [self.head, *self.list, self.tail] if m)
         )
 
     def __len__(self) -> int:
@@ -42,6 +42,8 @@ class PizzasStep(Step):
 class PizzasSlide(Slide):
     """Animate pizzas slide so it reproduces the small git history."""
 
+    outputs = ("pizzas_repo", "pizzas_files", "pizzas_diffs")
+
     def animate(self) -> Tuple[Repo, FileTree, List[DiffedFile | Constant]]:
 
         # Use this dynamical step as a workspace for edition,
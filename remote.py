@@ -48,6 +48,8 @@ class RemoteStep(Step):
 
 
 class RemoteSlide(Slide):
+    inputs = ("pizzas_repo", "pizzas_files", "pizzas_diffs")
+
     def animate(
         self,
         pizzas_repo: Repo,
@@ -636,7 +638,7 @@ class RemoteSlide(Slide):
         STEP()
 
         for repo in (my_repo, remote, their_repo):
-            repo.trim(4)
+            repo.view(5, markers=False)  # (hide the first commits)
         remote.intro.location = "-.10" + y_up_repos
         their_repo.intro.location = ".40" + y_down_repos
         my_pointer.start = "above right=25 and 10 of mine-last"
@@ -644,7 +646,7 @@ class RemoteSlide(Slide):
         their_pointer.start = "above right=25 and 50 of theirs-last"
         their_pointer.end = "right=5 of remote-1-message.south east"
         for p in (my_pointer, their_pointer):
-            p.end = p.end.replace("d1e8c8c", remote.commits[0].hash)
+            p.end = p.end.replace("d1e8c8c", remote.commits[4].hash)
         STEP()
 
         # Two diverging commits.
@@ -756,7 +758,7 @@ class RemoteSlide(Slide):
         my_pointer.style = ""
 
         remote.switch_branch("dev")
-        remote.add_commit(c_calzone.copy(), i=2).type = "Y"
+        remote.add_commit(c_calzone.copy(), i=6).type = "Y"
         remote.hi_on(c_calzone.hash)
         remote.switch_branch("main")
         my_repo.remote_to_branch(web_dev)
@@ -1014,7 +1016,7 @@ class RemoteSlide(Slide):
         left.hi_off("9549b2a")
         left_command.text = "git commit"
         for r in (left, right):
-            c = r.add_commit("H", "8dd46ef", "Surprise pizza.", i=3)
+            c = r.add_commit("H", "8dd46ef", "Surprise pizza.", i=7)
         left.hi_on(c.hash)
         STEP()
 
@@ -1211,7 +1213,7 @@ class RemoteSlide(Slide):
         )
         tf.bend = "25"
         tf.side = "left"
-        their_repo.add_commit(c_calzone, i=2)
+        their_repo.add_commit(c_calzone, i=6)
         their_repo.move_branch("origin/dev", c_calzone.hash)
         their_repo.add_commit(c_merge)
         their_repo.move_branch("origin/dev", c_merge.hash)
@@ -1299,8 +1301,8 @@ class RemoteSlide(Slide):
         [remote.hi_off(k.hash) for k in [c_rebased]]
         STEP()
 
-        my_repo.pop_commit(2)
-        remote.pop_commit(2)
+        my_repo.pop_commit(6)
+        remote.pop_commit(6)
         STEP()
 
         # Pull rebased commit on their side.
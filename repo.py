@@ -1,12 +1,16 @@
 """Craft and edit a simple repo.
 """
 
-from typing import Callable, Dict, Iterable, List, Set, cast
+from copy import copy
+from heapq import heapify, heappop, heappush
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Self, Set, Tuple, cast
 
 from document import FindPlaceHolder, HighlightSquare
+import gitimport
 from modifiers import (AnonymousPlaceHolder, Builder, ListBuilder,
                        MakePlaceHolder, PlaceHolder, TextModifier,
-                       render_method)
+                       _register, render_method)
 
 CommitModifier, Commit = MakePlaceHolder("Commit", r"<type>/<hash>/{<message>}")
 
@@ -39,11 +43,245 @@ def new_label(name: str) -> PlaceHolder:
 Commits = ListBuilder(Commit, ",\n", tail=True)
 
 
+class _RepoIndex(object):
+    """Position of every commit by hash, and of every label by name.
+    Positions are stored shifted by the number of commits trimmed so far,
+    so that trimming does not require updating the others.
+    On duplicate hashes, the first commit wins like with a linear scan.
+    Commits are watched like by rendering parents (see `TextModifier.invalidate`),
+    so that the index is dropped as soon as one is modified, hash possibly.
+    """
+
+    def __init__(self, repo: "Repo"):
+        self.repo = repo
+        self.trimmed = 0
+        self.hashes: Dict[str, int] = {}
+        self.labels: Dict[str, Tuple[PlaceHolder, int]] = {}
+        # Raised when removing a commit may reveal another one with the same hash.
+        self.duplicates = False
+        for i, (commit, labels) in enumerate(zip(repo.commits, repo.labels)):
+            self.append(commit, i)
+            for label in labels:
+                self.labels.setdefault(label.name, (label, i))
+
+    def append(self, commit: PlaceHolder, i: int):
+        """Index a new last commit."""
+        commit.__dict__.setdefault("_parents", set()).add(self)
+        if (hash := commit.hash) in self.hashes:
+            self.duplicates = True
+        else:
+            self.hashes[hash] = i + self.trimmed
+
+    def remove(self, commit: PlaceHolder, labels: List[PlaceHolder]):
+        """Forget first or last commit."""
+        commit.__dict__.get("_parents", set()).discard(self)
+        del self.hashes[commit.hash]
+        for label in labels:
+            self.labels.pop(label.name, None)
+
+    def invalidate(self):
+        """One commit has been modified."""
+        if self.repo.__dict__.get("_index") is self:
+            self.repo._reindex()
+
+    def unwatch(self):
+        for commit in self.repo.commits:
+            commit.__dict__.get("_parents", set()).discard(self)
+
+    def commit(self, hash: str) -> int | None:
+        """Position of the commit with this hash."""
+        if (i := self.hashes.get(hash)) is None:
+            return None
+        return i - self.trimmed
+
+    def label(self, name: str) -> Tuple[PlaceHolder, int] | None:
+        """Label with this name and position of the commit it points to."""
+        if (found := self.labels.get(name)) is None:
+            return None
+        label, i = found
+        return label, i - self.trimmed
+
+    def set_label(self, label: PlaceHolder, i: int | None):
+        if i is None:
+            self.labels.pop(label.name, None)
+        else:
+            self.labels[label.name] = (label, i + self.trimmed)
+
+
+class History(object):
+    """Commits graph with pointers to their parents, in the order they were added
+    (parents first), laid out into lanes like `git log --graph`
+    instead of crafting the chains types by hand.
+    The main lane is the first-parents ancestry of the main commit,
+    the others are allocated to branches as they fork and released as they merge.
+    Only the main lane and one other can be drawn though (see `rows`).
+    """
+
+    def __init__(self):
+        self.hashes: List[str] = []
+        self.messages: Dict[str, str] = {}
+        self.parents: Dict[str, Tuple[str, ...]] = {}
+        self.flags: Dict[str, str] = {}  # (extra commit types like "hi")
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def commit(
+        self,
+        hash: str,
+        message: str,
+        parents: str | Tuple[str, ...] | None = None,
+        flags: str = "",
+    ) -> str:
+        """Add a commit on top of its parents, defaulting to the last commit added.
+        The first parent of a merge commit is the one merged into.
+        """
+        assert hash not in self.parents, f"Duplicate commit {repr(hash)}."
+        if parents is None:
+            parents = (self.hashes[-1],) if self.hashes else ()
+        elif isinstance(parents, str):
+            parents = (parents,)
+        for parent in parents:
+            assert parent in self.parents, f"Unknown parent {repr(parent)}."
+        self.hashes.append(hash)
+        self.messages[hash] = message
+        self.parents[hash] = parents
+        self.flags[hash] = flags
+        return hash
+
+    def mainline(self, main: str | None = None) -> Set[str]:
+        """First-parents ancestry of the main commit, defaulting to the last one."""
+        line: Set[str] = set()
+        if not self.hashes:
+            return line
+        hash: str | None = main or self.hashes[-1]
+        while hash is not None:
+            line.add(hash)
+            parents = self.parents[hash]
+            hash = parents[0] if parents else None
+        return line
+
+    def order(self, mainline: Set[str]) -> List[str]:
+        """Commits in drawing order: parents first, in the order they were added,
+        except that commits off the mainline are drawn as soon as their parents are,
+        so that branches are drawn right above the commit they fork from.
+        """
+        rank = {hash: i for i, hash in enumerate(self.hashes)}
+        children: Dict[str, List[str]] = {hash: [] for hash in self.hashes}
+        waiting: Dict[str, int] = {}  # Number of parents not drawn yet.
+        for hash in self.hashes:
+            parents = set(self.parents[hash])
+            waiting[hash] = len(parents)
+            for parent in parents:
+                children[parent].append(hash)
+        ready = [(h in mainline, rank[h], h) for h, n in waiting.items() if not n]
+        heapify(ready)
+        order = []
+        while ready:
+            _, _, hash = heappop(ready)
+            order.append(hash)
+            for child in children[hash]:
+                waiting[child] -= 1
+                if not waiting[child]:
+                    heappush(ready, (child in mainline, rank[child], child))
+        return order
+
+    def lanes(self, main: str | None = None) -> List[Tuple[str, int]]:
+        """Lane of every commit in drawing order, in one pass: 0 for the mainline,
+        otherwise the lane of the first parent not continued yet,
+        or else the lowest free one.
+        Lanes of the other parents are released when merged.
+        """
+        mainline = self.mainline(main)
+        lanes: Dict[str, int] = {}
+        tips: Dict[int, str] = {}  # Last commit on every lane in use but the main one.
+        free: List[int] = []  # (heap)
+        n_lanes = 1
+        for hash in self.order(mainline):
+            parents = self.parents[hash]
+            if hash in mainline:
+                lane = 0
+            else:
+                lane = next(
+                    (l for p in parents if (l := lanes[p]) and tips.get(l) == p), 0
+                )
+                if not lane:
+                    if free:
+                        lane = heappop(free)
+                    else:
+                        lane = n_lanes
+                        n_lanes += 1
+                tips[lane] = hash
+            for parent in parents:
+                if (l := lanes[parent]) and l != lane and tips.get(l) == parent:
+                    del tips[l]
+                    heappush(free, l)
+            lanes[hash] = lane
+        return list(lanes.items())
+
+    def rows(
+        self, main: str | None = None, strict: bool = True
+    ) -> List[Tuple[str, str, str]]:
+        """Hash, message and type of every commit in drawing order,
+        for the `\\Repo` macro which only draws a straight and a parallel chain:
+            I: on the straight chain, following the previous straight commit.
+            Y: forking the parallel chain from the last straight commit.
+            H: on the parallel chain, following the previous parallel commit.
+            A: on the straight chain, merging the parallel chain into it.
+        Raise ValueError on graphs it cannot draw, unless not strict:
+        commits that cannot be drawn (on further lanes, forking from former commits,
+        with parents out of the history..) are then flattened onto the straight chain,
+        like `git log` without `--graph`.
+        """
+        lanes = dict(self.lanes(main))
+        straight: str | None = None
+        parallel: str | None = None  # (while not merged)
+        rows = []
+        for hash, lane in lanes.items():
+            parents = self.parents[hash]
+            type: str | None = None
+            problem = ""
+            if lane == 0:
+                first, *merged = parents or (None,)
+                if not merged:
+                    type = "I"
+                elif merged == [parallel] and parallel:
+                    type = "A"
+                    parallel = None
+                else:
+                    problem = "merges other than parallel chain"
+                if first != straight:
+                    problem = "does not follow the straight chain"
+            elif lane > 1:
+                problem = "would need more than two chains"
+            elif len(parents) != 1:
+                kind = "a merge" if parents else "a root"
+                problem = f"off the straight chain is {kind}"
+            elif lanes[parents[0]] == 0 and parents[0] == straight and not parallel:
+                type = "Y"
+            elif parents[0] == parallel:
+                type = "H"
+            else:
+                problem = "forks from a former commit"
+            if problem and strict:
+                raise ValueError(f"Commit {hash} {problem}.")
+            type = type or "I"
+            if type in ("Y", "H"):
+                parallel = hash
+            else:
+                straight = hash
+            type = f"{type} {self.flags[hash]}".strip()
+            rows.append((hash, self.messages[hash], type))
+        return rows
+
+
 class Repo(TextModifier):
     """One chain of commits, arranged from the bottom up.
     Be careful that the first one needs be anchored,
     and the others are located wrt to it.
     Also, use labels to point to commits like `HEAD`, `main` and `remote/main`.
+    Commits are either added one by one with their chain type,
+    or loaded from a `History` graph laid out automatically.
     The logical state of the repo here is only concern with topology:
         - the commits chain
         - for every commit, the list of pointers on it.
@@ -52,6 +290,14 @@ class Repo(TextModifier):
     Only when rendering is the above information translated into exact positionning etc.
     """
 
+    # Members edited on render, so every recorded repo needs its own.
+    _positioned = ("labels", "head", "branch", "locks", "current", "hi_square")
+    # Lookup index, rebuilt on demand for copies.
+    _internals = TextModifier._internals + ("_index",)
+    # Labels layouts computed so far, by topology (see `_layout_key`).
+    _layouts: Dict[Tuple, Tuple[List[Tuple[str, Tuple]], List[str]]] = {}
+    _max_layouts = 1000
+
     def __init__(self, input: str):
         """Assume it's parsed *empty*."""
         intro, rest = input.split("{}", 1)
@@ -90,6 +336,41 @@ class Repo(TextModifier):
         # Locked labels appear with a little icon to their right.
         self.locks: Dict[str, PlaceHolder] = {}  # {branchname: LabelModifier}
 
+        # Only commits within this range are drawn (python indices, see `view`),
+        # the others are elided along with their labels.
+        self.view_start = 0
+        self.view_end: int | None = None  # (none to follow the latest commits)
+        self.elided_markers = True
+
+    def snapshot(self, memo: Dict[int, Any] | None = None) -> Self:
+        """Share the commits with previous snapshots, but not the labels,
+        otherwise positionning them when rendering one snapshot
+        would modify the others.
+        """
+        if memo is None:
+            memo = {}
+        if (i := id(self)) in memo:
+            return memo[i]
+        shared = super().snapshot(memo)
+        new = copy(shared)
+        own: Dict[int, TextModifier] = {}  # (preserve aliasing among labels)
+
+        def private(value: Any) -> Any:
+            if isinstance(value, TextModifier):
+                if (j := id(value)) not in own:
+                    own[j] = copy(value)
+                return own[j]
+            if isinstance(value, list):
+                return [private(v) for v in value]
+            if isinstance(value, dict):
+                return {k: private(v) for k, v in value.items()}
+            return value
+
+        for k in self._positioned:
+            new.__dict__[k] = private(shared.__dict__[k])
+        memo[i] = new
+        return new
+
     @property
     def name(self):
         return self.intro.name
@@ -106,244 +387,362 @@ class Repo(TextModifier):
         return (
             self.intro.render()
             + "{\n"
-            + self.commits.render()
+            + self._render_commits()
             + "}{\n"
             + "\n".join(m.render() for m in epilog)
             + "}\n"
             + self.hi_square.render()
         )
 
+    def _viewed(self) -> Tuple[int, int]:
+        """Python range of the commits drawn."""
+        n = len(self.commits)
+        end = n if self.view_end is None else min(self.view_end, n)
+        return min(self.view_start, end), end
+
+    def _render_commits(self) -> str:
+        """Only the commits within view, with markers for the ones elided."""
+        start, end = self._viewed()
+        commits = self.commits.list
+        if (start, end) == (0, len(commits)):
+            return self.commits.render()
+        rows = []
+        if start and self.elided_markers:
+            rows.append(self._marker("earlier", start))
+        for commit in commits[start:end]:
+            _register(self, commit)  # (not rendered via self.commits)
+            rows.append(commit.render())
+        if end < len(commits) and self.elided_markers:
+            rows.append(self._marker("later", len(commits) - end))
+        return ",\n".join(rows)
+
+    def _marker(self, which: str, n: int) -> str:
+        """Row standing for elided commits."""
+        text = f"{n} {which} commit{'s' if n > 1 else ''}"
+        return Commit.new("I elided", f"{self.name}-{which}", text).render()
+
     def pre_render(self) -> List[PlaceHolder]:
         """Fill out every positionning etc. information based on the state,
         before rendering. Constructs the epilog in correct order.
+        The labels layout only depends on the repo topology,
+        so it's computed once for every distinct topology.
         """
+        key = self._layout_key()
+        if (layout := Repo._layouts.get(key)) is None:
+            if len(Repo._layouts) >= Repo._max_layouts:
+                Repo._layouts.clear()
+            layout = Repo._layouts[key] = self._layout()
+        assignments, chains = layout
+
+        # Every label in view by name.
+        start, end = self._viewed()
+        viewed = self.labels[start:end]
+        items = {label.name: label for labels in viewed for label in labels}
+        items.update((lock.name, lock) for lock in self.locks.values())
+        if self.branch:
+            items[self.branch.name] = self.branch
+        items["HEAD"] = self.head
+        for name, values in assignments:
+            item = items[name]
+            for k, v in values:
+                setattr(item, k, v)
 
-        head = self.head
+        # Highlight.
+        commits = self.commits.list[start:end]
+        full = (start, end) == (0, len(self.commits))
+        # Rows drawn, with markers standing for elided commits.
+        rows = [commit.hash for commit in commits]
+        if self.elided_markers and not full:
+            if start:
+                rows.insert(0, f"{self.name}-earlier")
+            if end < len(self.commits):
+                rows.append(f"{self.name}-later")
+        if not rows:
+            # (labels are then drawn like within an empty repo)
+            self.current.off()
+            self.hi_square.lower = "HEAD.south west"
+            self.hi_square.upper = "main.north east"
+            self.hi_square.padding = "2"
+        else:
+            self.current.on().hash = self.branch.ref if self.branch else self.head.ref
+            if not full:
+                checked = self.branch.name if self.branch else "HEAD"
+                found = self._indexed().label(checked)
+                if not found or not start <= found[1] < end:
+                    self.current.off()  # (checked out commit elided)
+            # Square highlight needs identifier of the first commit,
+            # and east coordinate of the longest message.
+            # TODO: 'main' is not always the northest label north coordinate.
+            first = east = rows[0]  # (only markers in view)
+            if commits:
+                first = commits[0].hash
+                east = max(commits, key=lambda c: len(c.message)).hash
+            # Without main label (its commit elided), the last row drawn is northest.
+            drawn = full or any(l.name == "main" for labels in viewed for l in labels)
+            north = "main.north" if drawn else rf"{rows[-1]}-hash.north"
+            self.hi_square.lower = rf"{first}-hash.south west"
+            self.hi_square.upper = rf"{east}-message.east |- {north}"
+            self.hi_square.padding = "3"
+
+        epilog = [items[name] for name in chains] if self._render_labels else []
+        epilog.append(self.current)
+        return epilog
+
+    def _layout_key(self) -> Tuple:
+        """Everything the labels layout depends on."""
+        start, end = self._viewed()
+        return (
+            self.name,
+            self.elided_markers and end < len(self.commits),
+            self.branch.name if self.branch else None,
+            frozenset(self.left_labels),
+            tuple(sorted((name, lock.name) for name, lock in self.locks.items())),
+            # (only labelled commits are referred to)
+            tuple(
+                (commit.type, commit.hash, tuple(label.name for label in labels))
+                if labels
+                else commit.type
+                for commit, labels in zip(
+                    self.commits.list[start:end], self.labels[start:end]
+                )
+            ),
+        )
+
+    def _layout(self) -> Tuple[List[Tuple[str, Tuple]], List[str]]:
+        """Position every label depending on how many they are on every commit
+        and whether it's the last commit, in one pass over the commits.
+        Labels are only referred to by name,
+        yielding the values to assign them and the names chained in the epilog.
+        """
+        assignments: List[Tuple[str, Tuple]] = []
+
+        def assign(name: str, **values: str):
+            assignments.append((name, tuple(values.items())))
+
+        head = "HEAD"
+        branch = self.branch.name if self.branch else None
+        detached = branch is None
+        locks = {name: lock.name for name, lock in self.locks.items()}
+        start, end = self._viewed()
+        commits = self.commits.list[start:end]
+        n = len(commits)
+        # (the last commit drawn is not the topmost one below a marker)
+        top = -1 if self.elided_markers and end < len(self.commits) else n - 1
 
         # One epilog for each items chain right and left of the commit.
         left_chains = []  # with HEAD for the last commit and left-marked labels.
         right_chains = []  # with HEAD for detached states and non-last commits.
 
-        def set_head_left_of_branch(branch: PlaceHolder, last_commit=False):
-            head.ref = branch.name + ".base west"
-            head.anchor = "base east"
-            head.offset = "11" if last_commit else "21"
-            head.start = "2"
+        def set_head_left_of_branch(branch: str, last_commit=False):
+            assign(
+                head,
+                ref=branch + ".base west",
+                anchor="base east",
+                offset="11" if last_commit else "21",
+                start="2",
+            )
 
-        if not self.commits.list:
+        if not commits:
             # Empty repo, cheat with the only branch here.
-            assert (branch := self.branch)
-            branch.ref = self.name
-            set_head_left_of_branch(self.branch)
-            right_chains = [self.branch, self.head]
-
-        # Now, position every label correctly
-        # depending on how many they are on every commit
-        # and whether it's the last commit.
+            assert branch
+            assign(branch, ref=self.name)
+            set_head_left_of_branch(branch)
+            right_chains = [branch, head]
+
+        # Precompute per-commit facts in one backward sweep:
+        # whether any further commit opens/closes a second chain.
+        types = [commit.type.split() for commit in commits]
+        further = [False] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            further[i] = further[i + 1] or any(t in types[i] for t in ("H", "A"))
+
         # The idea is to fill 'left' and 'right'
-        # with the correctly parametrized modifiers,
+        # with the correctly parametrized items,
         # and then only they will be chained to each other.
         two_chains = False  # Raise when there are two open parallel commit chains.
         second_chain = (
             False  # Raise when this leads to the second arrow being locally drawn.
         )
-        for (i_commit, (commit, labels)) in enumerate(zip(self.commits, self.labels)):
-            last_commit = i_commit == len(self.labels) - 1
-            if "Y" in commit.type.split():
+        labels_viewed = self.labels[start:end]
+        for i_commit, (commit, labels) in enumerate(zip(commits, labels_viewed)):
+            last_commit = i_commit == top
+            tp = types[i_commit]
+            if "Y" in tp:
                 two_chains = True
-            if "A" in commit.type.split():
+            if "A" in tp:
                 two_chains = False
                 second_chain = False
             if two_chains:
-                # Go check further whether there is actually a second commit.
-                second_chain = False
-                for further_commit in self.commits[i_commit + 1 :]:
-                    tp = further_commit.type.split()
-                    if any(t in tp for t in ("H", "A")):
-                        second_chain = True
-                        break
+                # Check whether there is actually a second commit further.
+                second_chain = further[i_commit + 1]
             if not labels:
                 continue
 
+            names = [label.name for label in labels]
             left = []
             right = []
 
-            # Correctly fill up the right/left chains.
-            # Work on a copy of all labels and progressively drain it
+            # Correctly fill up the right/left chains,
             # until items are all correctly ordered within the two chains.
-            remaining = labels.copy()
-            for label in labels:
+            placed = set()
+            for name in names:
                 # Insert into chains on a per-branch basis
                 # to correctly group remotes/lock/head together.
-                if label.name != "HEAD" and "/" not in (branch := label).name:
-                    if branch.name in self.left_labels:
-                        # Insert at the end of the chain unless it's the branch checked out.
-                        left.append(branch)
-                        remaining.remove(branch)
-                        if branch.name in self.locks:
-                            left.insert(len(left) - 1, self.locks[branch.name])
-                        if self.branch is branch:
-                            left.append(self.head)
-                        for remote in labels:
-                            if remote.name.endswith("/" + branch.name):
-                                left.append(remote)
-                                remaining.remove(remote)
-                    else:
-                        # Insert at the end of the chain unless it's the branch checked out.
-                        i = 0 if branch is self.branch else len(right)
-                        right.insert(i, branch)
+                if name == head or "/" in name:
+                    continue
+                remotes = [r for r in names if r.endswith("/" + name)]
+                placed.add(name)
+                placed.update(remotes)
+                if name in self.left_labels:
+                    # Insert at the end of the chain unless it's the branch checked out.
+                    left.append(name)
+                    if name in locks:
+                        left.insert(len(left) - 1, locks[name])
+                    if name == branch:
+                        left.append(head)
+                    left.extend(remotes)
+                else:
+                    # Insert at the end of the chain unless it's the branch checked out.
+                    i = 0 if name == branch else len(right)
+                    right.insert(i, name)
+                    i += 1
+                    if name in locks:
+                        right.insert(i, locks[name])
                         i += 1
-                        remaining.remove(branch)
-                        if branch.name in self.locks:
-                            right.insert(i, self.locks[branch.name])
+                    if name == branch:
+                        if last_commit:
+                            # HEAD goes to the left with special positionning
+                            left.append(head)
+                        else:
+                            right.insert(i, head)
                             i += 1
-                        if branch is self.branch:
-                            if last_commit:
-                                # HEAD goes to the left with special positionning
-                                left.append(self.head)
-                            else:
-                                right.insert(i, self.head)
-                                i += 1
-                        for remote in labels:
-                            if remote.name.endswith("/" + branch.name):
-                                right.insert(i, remote)
-                                i += 1
-                                remaining.remove(remote)
+                    right[i:i] = remotes
             # Remaining items go last into to either chains.
-            for label in remaining:
-                if label.name in self.left_labels or label.name == "HEAD":
-                    left.append(label)
-                else:
-                    right.append(label)
+            for name in names:
+                if name not in placed:
+                    if name in self.left_labels or name == head:
+                        left.append(name)
+                    else:
+                        right.append(name)
 
             # Now precise the exact, literal positionning
             # of every items in the chains.
             for i, item in enumerate(left):  # (iterate from east to west)
                 # The first one is positionned wrt current commit.
                 if i == 0:
-                    if (head := item) is self.head and not self.detached:
-                        head.anchor = "base east"
-                        head.ref = right[0].name + ".base west"
-                        head.offset = "10"
-                        head.start = "2"
+                    if item == head and not detached:
+                        assign(
+                            head,
+                            anchor="base east",
+                            ref=right[0] + ".base west",
+                            offset="10",
+                            start="2",
+                        )
                     else:
-                        item.anchor = "base east"
-                        item.offset = "137:10"
-                        n = len(item.name)  # to calculate ideal arrow start.
-                        item.start = f"{3.7*n}, 4"
-                        item.ref = commit.hash
+                        assign(
+                            item,
+                            anchor="base east",
+                            offset="137:10",
+                            # (ideal arrow start)
+                            start=f"{3.7*len(item)}, 4",
+                            ref=commit.hash,
+                        )
                     continue
                 # Subsequent ones are positionned wrt previous item.
                 previous = left[i - 1]
-                item.ref = previous.name + ".base west"
-                item.anchor = "base east"
+                assign(item, ref=previous + ".base west", anchor="base east")
                 # Special-case head, because it's different whether attached.
-                if self.head is (head := item):
-                    if i == 0:
-                        pass  # Already handled.
+                if item == head:
+                    if detached:  #! NOT UPDATED AFTER COPY-PASTE.
+                        assign(head, offset="156:20", anchor="center", start=".5,0")
                     else:
-                        if self.detached:  #! NOT UPDATED AFTER COPY-PASTE.
-                            head.offset = "156:20"  #!
-                            head.anchor = "center"  #!
-                            head.start = ".5,0"  #!
-                        else:
-                            head.offset = "5"
-                            head.start = "2"
+                        assign(head, offset="5", start="2")
                 else:
-                    item.offset = "0" if "-lock" in item.name else "2"
-                    item.start = "noarrow"
+                    assign(
+                        item,
+                        offset="0" if "-lock" in item else "2",
+                        start="noarrow",
+                    )
 
             for i, item in enumerate(right):
                 # The first is positioned wrt current commit.
                 if i == 0:
-                    branch = item
-                    if self.head in right and not self.detached and last_commit:
+                    if head in right and not detached and last_commit:
                         set_head_left_of_branch(item)
-                    branch.ref = commit.hash
-                    branch.anchor = "base west"
                     if last_commit:
-                        branch.offset = "45:13"
-                        branch.start = "4.5, 2"
+                        offset, start = "45:13", "4.5, 2"
+                    elif second_chain and "I" in commit.type.split():
+                        # Shift right a little so it does not cover the arrow.
+                        offset, start = "15.5, 6.5", "2, 2"
                     else:
-                        if second_chain and "I" in commit.type.split():
-                            # Shift right a little so it does not cover the arrow.
-                            branch.offset = "15.5, 6.5"
-                            branch.start = "2, 2"
-                        else:
-                            branch.offset = "36:11"
-                            branch.start = "2, 3.3"
+                        offset, start = "36:11", "2, 3.3"
+                    assign(
+                        item,
+                        ref=commit.hash,
+                        anchor="base west",
+                        offset=offset,
+                        start=start,
+                    )
                     continue
                 previous = right[i - 1]
-                item.ref = previous.name + ".base east"
-                item.anchor = "base west"
+                assign(item, ref=previous + ".base east", anchor="base west")
                 # Special-case head, because it's different whether attached.
-                if self.head is (head := item):
-                    if self.detached:
-                        head.offset = "140:20" if last_commit else "156:20"
-                        head.anchor = "center"
-                        head.start = ".5,0"
+                if item == head:
+                    if detached:
+                        assign(
+                            head,
+                            offset="140:20" if last_commit else "156:20",
+                            anchor="center",
+                            start=".5,0",
+                        )
                     else:
-                        head.offset = "5"
-                        head.start = "2"
+                        assign(head, offset="5", start="2")
                 else:
-                    item.offset = "0" if "-lock" in item.name else "2"
-                    item.start = "noarrow"
+                    assign(
+                        item,
+                        offset="0" if "-lock" in item else "2",
+                        start="noarrow",
+                    )
 
             left_chains.extend(left)
             right_chains.extend(right)
 
-        # Highlight.
-        if not self.commits.list:
-            self.current.off()
-            self.hi_square.lower = "HEAD.south west"
-            self.hi_square.upper = "main.north east"
-            self.hi_square.padding = "2"
-        else:
-            self.current.on().hash = self.branch.ref if self.branch else self.head.ref
-            # Square highlight needs identifier of the first commit,
-            # and east coordinate of the longest message.
-            # TODO: 'main' is not always the northest label north coordinate.
-            longest = self.commits[0]
-            first = longest.hash
-            for commit in self.commits:
-                if len(longest.message) < len(commit.message):
-                    longest = commit
-            longest = longest.hash
-            self.hi_square.lower = rf"{first}-hash.south west"
-            self.hi_square.upper = rf"{longest}-message.east |- main.north"
-            self.hi_square.padding = "3"
-
-        epilog = (right_chains + left_chains) if self._render_labels else []
-        epilog.append(self.current)
-        return epilog
+        return assignments, right_chains + left_chains
+
+    def _indexed(self) -> _RepoIndex:
+        """Lookup index, built on first use."""
+        if (index := self.__dict__.get("_index")) is None:
+            index = self._index = _RepoIndex(self)
+        return index
+
+    def _reindex(self):
+        """Drop the index after edits it cannot follow cheaply."""
+        if index := self.__dict__.pop("_index", None):
+            index.unwatch()
+
+    def _relocate(self, label: PlaceHolder, i: int | None):
+        """Move label to the list of the i-th commit, or remove it if none."""
+        index = self._indexed()
+        if found := index.label(label.name):
+            _, j = found
+            if j == i:
+                return
+            self.labels[j].remove(label)
+        if i is not None:
+            self.labels[i].append(label)
+        index.set_label(label, i)
 
     def move_branch(self, name: str, hash: str) -> "Repo":
         # Essentially relocating it to the correct list of labels.
         branch = self[name]
-        for (commit, labels) in zip(self.commits, self.labels):
-            if commit.hash == hash:
-                if branch not in labels:
-                    labels.append(branch)
-            else:
-                try:
-                    labels.remove(branch)
-                except ValueError:
-                    pass
+        self._relocate(branch, self._indexed().commit(hash))
         return self
 
     def switch_detached(self, hash: str) -> "Repo":
         self.branch = None
         # Add HEAD to the labels.
         head = self.head
-        for (commit, labels) in zip(self.commits, self.labels):
-            if commit.hash == hash:
-                if not head in labels:
-                    labels.append(head)
-            else:
-                try:
-                    labels.remove(head)
-                except ValueError:
-                    pass
+        self._relocate(head, self._indexed().commit(hash))
         head.ref = hash
         return self
 
@@ -352,26 +751,15 @@ class Repo(TextModifier):
         branch = self[name]
         self.branch = branch
         self.head.ref = branch.name
-        for labels in self.labels:
-            try:
-                labels.remove(self.head)
-            except ValueError:
-                pass
+        self._relocate(self.head, None)
         return self
 
     def remote_to_branch(self, name: str) -> "Repo":
         # Relocate remote.
         remote = self[name]
         branch = self[name.split("/")[1]]
-        for labels in self.labels:
-            if branch in labels:
-                if not remote in labels:
-                    labels.append(remote)
-            else:
-                try:
-                    labels.remove(remote)
-                except ValueError:
-                    pass
+        found = self._indexed().label(branch.name)
+        self._relocate(remote, found[1] if found else None)
         return self
 
     def add_commit(
@@ -383,7 +771,8 @@ class Repo(TextModifier):
         _branch: str | None = None,
         **kwargs,
     ) -> PlaceHolder:  # Commit
-        i = len(self.commits) if i is None else i
+        last = len(self.commits)
+        i = last if i is None else i
         if len(args) == 1 and not kwargs:
             commit = args[0].copy()
             commit = self.commits.insert(i, commit)
@@ -392,6 +781,11 @@ class Repo(TextModifier):
         hash = commit.hash
 
         self.labels.insert(i, [])
+        self._shift_view(i, 1)
+        if i == last and (index := self.__dict__.get("_index")):
+            index.append(commit, i)
+        else:
+            self._reindex()  # (every further position is shifted)
 
         # Interpret the branch to be moved along.
         if _branch is None:
@@ -407,13 +801,15 @@ class Repo(TextModifier):
         return commit
 
     def add_branch(self, name: str, hash: str) -> PlaceHolder:  # Branch
-        i, c = 0, None
-        for i, c in enumerate(self.commits):
-            if c.hash == hash:
-                break
-        assert c
+        assert self.commits.list
+        index = self._indexed()
+        assert not index.label(name)
+        i = index.commit(hash)
+        if i is None:
+            i = len(self.commits) - 1  # (where a linear search would have stopped)
         branch = new_label(name)
         self.labels[i].append(branch)
+        index.set_label(branch, i)
         return branch
 
     def lock_branch(self, name: str) -> PlaceHolder:  # Label
@@ -430,12 +826,13 @@ class Repo(TextModifier):
             return self.branch
         if name == "current":
             return self.current
-        for (commit, labels) in zip(self.commits, self.labels):
-            if commit.hash == name:
-                return commit
-            for label in labels:
-                if label.name == name:
-                    return label
+        # First one found from the bottom, commit first.
+        index = self._indexed()
+        i = index.commit(name)
+        if (found := index.label(name)) and (i is None or found[1] < i):
+            return found[0]
+        if i is not None:
+            return self.commits[i]
         raise KeyError(f"Could not find reference {repr(name)} in repo.")
 
     def add_remote_branch(
@@ -443,23 +840,23 @@ class Repo(TextModifier):
         remote_branch: str,
         hash: str | None = None,  # Default to current such local branch.
     ) -> PlaceHolder:  # RemoteBranch
-        assert not any(
-            l.name == remote_branch for labels in self.labels for l in labels
-        )
+        index = self._indexed()
+        assert not index.label(remote_branch)
         rbranch = new_label(remote_branch)
+        i = None
         if hash is None:
             # Find local branch with this name and append there.
             _, branchname = remote_branch.split("/")
             local = self[branchname]
-            for labels in self.labels:
-                if local in labels:
-                    labels.append(rbranch)
-                    return rbranch
-        # Otherwise find commit with this ref:
-        for (commit, labels) in zip(self.commits, self.labels):
-            if commit.hash == hash:
-                labels.append(rbranch)
-                return rbranch
+            if found := index.label(local.name):
+                i = found[1]
+        else:
+            # Otherwise find commit with this ref:
+            i = index.commit(hash)
+        if i is not None:
+            self.labels[i].append(rbranch)
+            index.set_label(rbranch, i)
+            return rbranch
         raise ValueError(
             f"Could not find hash commit {repr(hash)} "
             f"to set remote branch {repr(remote_branch)} on."
@@ -542,6 +939,68 @@ class Repo(TextModifier):
         assert self.branch  # Otherwise there would be no branch left.
         self.commits.clear()
         self.labels.clear()
+        self._reindex()
+        self.view_start, self.view_end = 0, None
+        return self
+
+    def load(
+        self, history: History, main: str | None = None, strict: bool = True
+    ) -> "Repo":
+        """Replace commits with the history ones, laid out automatically
+        (see `History.rows`), with the checked out branch on the main commit.
+        """
+        rows = history.rows(main, strict)
+        self.clear()
+        for hash, message, type in rows:
+            self.add_commit(type, hash, message, _branch="")
+        if rows:
+            self.move_branch(cast(PlaceHolder, self.branch).name, main or rows[-1][0])
+        return self
+
+    def import_git(
+        self,
+        folder: Path | str,
+        *revisions: str,
+        limit: int | None = None,
+    ) -> "Repo":
+        """Replace commits and labels with the ones of an actual git repository:
+        the commits selected by the revisions (defaulting to HEAD),
+        only the latest ones if limited, their parents out of the selection ignored,
+        with the local and remote-tracking branches pointing to them, and HEAD.
+        HEAD needs be selected unless there is no commit yet.
+        Commits that cannot be drawn on two chains (further branches,
+        commits cut from their parents by the selection..) are flattened
+        onto the straight chain (see `History.rows`).
+        """
+        history = History()
+        short: Dict[str, str] = {}  # (full hashes only identify commits within git)
+        for full, hash, parents, message in gitimport.commits(
+            folder, *revisions, limit=limit
+        ):
+            short[full] = hash
+            kept = tuple(short[p] for p in parents if p in short)
+            history.commit(hash, gitimport.latex_escape(message), kept)
+        branch, head = gitimport.head(folder)
+        main = short.get(head) if head else None
+        if head and not main:
+            raise ValueError(f"HEAD is not among the commits selected in {folder}.")
+
+        # Checked out branch there becomes the one checked out here.
+        checked = self.branch
+        assert checked
+        if branch:
+            checked.name = checked.text = self.head.ref = branch
+        self.load(history, main, strict=False)
+        if not branch and main:
+            self._relocate(checked, None)
+            self.switch_detached(main)
+        for name, full, remote in gitimport.refs(folder):
+            if (hash := short.get(full)) is None or name == branch:
+                continue
+            if remote:
+                self.add_remote_branch(name, hash)
+            else:
+                self.add_branch(name, hash)
         return self
 
     def iter(self, start=1, end: int | None = None) -> Iterable[PlaceHolder]:  # Commit
@@ -591,27 +1050,62 @@ class Repo(TextModifier):
     def unfade_commits(self, *args, **kwargs):
         self.alter_commits(self.unfade_commit, *args, **kwargs)
 
+    def view(
+        self, start=1, end: int | None = None, markers: bool = True
+    ) -> "Repo":
+        """Only draw requested commits, counting from 1, end included, -1 is end,
+        and none for the last one even as more are added.
+        The others remain in the repo and can be viewed again later,
+        with markers in their place unless not requested.
+        """
+        self.view_start = start - 1
+        if end is not None and end < 0:
+            end += len(self.commits) + 1
+        self.view_end = end
+        self.elided_markers = markers
+        return self
+
+    def _shift_view(self, i: int, shift: int):
+        """Keep viewing the same commits when one is inserted/removed at i."""
+        if i < self.view_start:
+            self.view_start += shift
+        if self.view_end is not None and i < self.view_end:
+            self.view_end += shift
+
     def trim(self, n: int) -> "Repo":
         """Remove the first n commits (and associated branches) to make room."""
+        index = self.__dict__.get("_index")
         for _ in range(n):
-            self.commits.list.pop(0)
+            commit = self.commits.list.pop(0)
             labels = self.labels.pop(0)
             assert (
                 self.branch not in labels
             )  # Don't trim the branch checked out though.
+            if index and not index.duplicates:
+                index.remove(commit, labels)
+                index.trimmed += 1
+            else:
+                self._reindex()
+            self._shift_view(0, -1)
         return self
 
     def pop_commit(self, c: int | str) -> PlaceHolder:  # Commit
         """Either index by location or hash."""
         if type(c) is str:
-            i = None
-            for i, commit in enumerate(self.commits):
-                if commit.hash == c:
-                    break
+            i = self._indexed().commit(c)
             assert i
         elif type(c) is int:
             i = c
         else:
             assert False  # Type error.
-        self.labels.pop(i)
-        return self.commits.list.pop(i)
+        labels = self.labels.pop(i)
+        commit = self.commits.list.pop(i)
+        self._shift_view(i, -1)
+        index = self.__dict__.get("_index")
+        if index and not index.duplicates and i in (0, len(self.commits)):
+            index.remove(commit, labels)
+            if i == 0:
+                index.trimmed += 1
+        else:
+            self._reindex()  # (every further position is shifted)
+        return commit
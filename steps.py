@@ -1,7 +1,11 @@
 """Modifiers concerned with individual slides and their very concrete content.
 """
 
-from modifiers import TextModifier, AnonymousPlaceHolder
+from copy import copy
+from typing import Any, Dict, Self
+
+from modifiers import TextModifier, AnonymousPlaceHolder, Writer
+from modifiers import write_joined
 
 
 class Step(TextModifier):
@@ -11,6 +15,10 @@ class Step(TextModifier):
     by matching document information with their type name.
     """
 
+    # Streamed to the file like slides, so whole steps texts are never retained:
+    # only the texts of the modifiers within are cached.
+    _memoized = False
+
     def __init__(self, input: str):
         intro, body = input.split("{\n", 1)
         self.intro = AnonymousPlaceHolder(r"\Step[<type>]{<progress>}", "parse", intro)
@@ -25,28 +33,28 @@ class Step(TextModifier):
             f"Cannot parse body for Step type {type(self).__name__}."
         )
 
-    def render(self) -> str:
+    def snapshot(self, memo: Dict[int, Any] | None = None) -> Self:
+        """Every recorded step is a distinct value with its own intro,
+        because progress is only set after all steps have been recorded.
+        """
+        new = copy(super().snapshot(memo))
+        new.intro = copy(new.intro)
+        return new
+
+    def render_into(self, write: Writer):
         """Rendering a step is not a regular render,
         because only _prolog and _epilog special member makes sense
         and it should stay within the command.
         """
-        return (
-            self.intro.render()
-            + "{\n"
-            + (
-                "\n".join(m.render() for m in self._prolog)
-                if hasattr(self, "_prolog")
-                else ""
-            )
-            + self.render_body()
-            + "\n"
-            + (
-                "\n".join(m.render() for m in self._epilog)
-                if hasattr(self, "_epilog")
-                else ""
-            )
-            + "}"
-        )
+        self.intro.render_into(write)
+        write("{\n")
+        if hasattr(self, "_prolog"):
+            write_joined(write, "\n", self._prolog)
+        write(self.render_body())
+        write("\n")
+        if hasattr(self, "_epilog"):
+            write_joined(write, "\n", self._epilog)
+        write("}")
 
     def render_body(self):
         raise NotImplementedError(
@@ -0,0 +1,49 @@
+"""Checks of diffed lines columns and of views on them."""
+
+import pytest
+
+from diffs import DiffedFile, DiffLineColumns
+
+
+def new_columns(n_lines: int, chunk_size: int = 4) -> DiffLineColumns:
+    lines = DiffLineColumns()
+    lines.chunk_size = chunk_size
+    lines.insert(0, (("0", f"Line {i}.") for i in range(n_lines)))
+    return lines
+
+
+def test_view_follows_its_line():
+    lines = new_columns(10)
+    view = lines[6]
+    lines.insert(2, [("+", "New.")] * 5)
+    lines.delete(0, 3)
+    assert view.text == "Line 6."
+    view.mod = "-"
+    assert lines.mod(8) == "-"
+    assert lines.mods().count("-") == 1
+
+
+def test_view_on_removed_line_raises():
+    lines = new_columns(10)
+    view = lines[6]
+    lines.delete(5, 8)
+    with pytest.raises(LookupError):
+        view.text
+
+
+def test_edits_only_copy_their_chunks():
+    lines = new_columns(10)
+    before = lines.snapshot()
+    lines[9].text = "Edited."
+    after = lines.snapshot()
+    assert [a is b for a, b in zip(before.texts, after.texts)] == [True, True, False]
+    assert after.codes is before.codes
+    assert before.text(9) == "Line 9."
+
+
+def test_added_lines_are_views():
+    diff = DiffedFile.new(".", "README.md")
+    added = diff.add_lines("Margherita\nRegina", "+")
+    diff.insert_lines("Pizzas:", 1)
+    added[1].text = "Calzone"
+    assert diff.texts() == ["Pizzas:", "Margherita", "Calzone"]
@@ -0,0 +1,60 @@
+"""Checks of the repo model and of its lookup index."""
+
+from pathlib import Path
+import subprocess
+
+import pytest
+
+from repo import Repo
+
+
+def new_repo(n_commits: int) -> Repo:
+    repo = Repo(r"\Repo[repo][simple][1]{-1, -1}{}{}")
+    for i in range(n_commits):
+        repo.add_commit("I", f"{i:07x}", f"Commit {i}.")
+    return repo
+
+
+def test_lookup_after_hash_assigned_in_place():
+    # Like staging.py fading commits in and out.
+    repo = new_repo(3)
+    next_commit = repo["0000002"]
+    next_commit.hash = "???????"
+    repo.switch_detached("0000001")
+    next_commit.hash = "ccccccc"
+    repo.switch_detached(next_commit.hash)
+    assert repo["ccccccc"] is next_commit
+    assert repo.head.ref == "ccccccc"
+    assert r"\Label[HEAD]" in repo.render()
+
+
+def git_repo(folder: Path, monkeypatch) -> Path:
+    """Seven commits on main and three branches off it, two of them merged."""
+    for var in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{var}_NAME", "Cook")
+        monkeypatch.setenv(f"GIT_{var}_EMAIL", "cook@pizza.it")
+
+    def git(*args: str):
+        subprocess.run(
+            ["git", "-C", str(folder), *args], check=True, capture_output=True
+        )
+
+    git("init", "-q", "-b", "main")
+    git("commit", "-q", "--allow-empty", "-m", "Root.")
+    for branch in ("calzone", "marinara", "diavola"):
+        git("checkout", "-q", "-b", branch, "main")
+        git("commit", "-q", "--allow-empty", "-m", f"Add {branch}.")
+    git("checkout", "-q", "main")
+    git("commit", "-q", "--allow-empty", "-m", "Tidy up.")
+    git("merge", "-q", "--no-ff", "-m", "Merge calzone.", "calzone")
+    git("merge", "-q", "--no-ff", "-m", "Merge marinara.", "marinara")
+    return folder
+
+
+@pytest.mark.parametrize("limit", [None, 2, 5])
+def test_import_git_many_branches(tmp_path: Path, monkeypatch, limit: int | None):
+    folder = git_repo(tmp_path, monkeypatch)
+    repo = new_repo(0).import_git(folder, "--all", limit=limit)
+    assert len(repo.commits) == (limit or 7)
+    assert repo["main"].name == "main"
+    assert r"\Label[main]" in repo.render()